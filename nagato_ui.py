@@ -7,7 +7,8 @@ import os
 from dotenv import load_dotenv
 
 # Import the TTS service for UI state feedback
-from services.tts import tts_service
+from services.tts import tts_service, STATUS_PHRASES, PRIORITY_HIGH
+from services.command_engine import command_engine, RUNNING
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +44,27 @@ class NagatoUI:
         self.setup_ui()
         self.start_pulse_animation()
         
+        # Commands run on the engine's worker thread; results come back through after()
+        command_engine.dispatch = lambda callback, *args: self.root.after(0, callback, *args)
+        command_engine.on_queue_changed = self.update_queue_label
+        # A new command aborts the one still running instead of waiting behind it
+        self.preempt_commands = os.getenv('COMMAND_PREEMPT', 'true').lower() == 'true'
+        self.streaming_job = None  # Job whose streamed answer is still being shown
+        
+        # Load the speech model in the background so the first click doesn't wait for it
+        from services.vtt import vtt_service
+        vtt_service.preload()
+        
+        # Pre-render fixed spoken phrases so status cues play instantly
+        if self.tts_enabled:
+            from services.process_command import command_processor
+            tts_service.preload_phrases(STATUS_PHRASES + command_processor.fixed_phrases)
+        
+        # Optionally listen for the wake word instead of waiting for a click
+        if os.getenv('WAKE_WORD_ENABLED', 'false').lower() == 'true':
+            from services.wake_word import wake_word_listener
+            wake_word_listener.start(self.on_wake_word)
+        
     def create_gradient(self, canvas, color1, color2):
         """Create a vertical gradient on the canvas"""
         height = 600
@@ -115,10 +137,22 @@ class NagatoUI:
             text="Tap to speak or type below",
             font=self.title_font,
             fg="#FFFFFF",
-            bg='#1A1A2E'
+            bg='#1A1A2E',
+            wraplength=360  # Wrap live transcripts instead of clipping them
         )
         self.status_label.pack(pady=20)
         
+        # Commands waiting for or running on the command engine
+        self.queue_label = tk.Label(
+            main_frame,
+            text="",
+            font=("Arial", 10),
+            fg="#8A8AA8",
+            bg='#1A1A2E',
+            wraplength=360
+        )
+        self.queue_label.pack()
+        
         # Create a frame for response area with scrolling capability
         response_frame = tk.Frame(main_frame, bg='#1A1A2E')
         response_frame.pack(pady=10, padx=25, fill=tk.BOTH, expand=True)
@@ -293,9 +327,9 @@ class NagatoUI:
         # Update UI state
         self.status_label.config(text="Processing...")
         
-        # Speak the status
+        # Speak the status, cutting off anything still playing from the last command
         if self.tts_enabled:
-            tts_service.say(self.status_label.cget("text"))
+            tts_service.say(self.status_label.cget("text"), priority=PRIORITY_HIGH, preempt=True)
             
         self.wave_height = 10
         self.animation_running = True
@@ -305,36 +339,60 @@ class NagatoUI:
         self.handle_command(command)
         
     def activate_assistant(self, event=None):
+        self.show_listening()
+        
+        # Start voice recognition in a separate thread to prevent UI freezing
+        self.root.after(100, self.start_voice_recognition)
+        
+    def on_wake_word(self, preroll):
+        """Called on the wake word detector thread with audio heard after the wake word"""
+        # Start recording straight away so the start of the command isn't lost
+        self.start_voice_recognition(preroll)
+        self.root.after(0, self.show_listening)
+        
+    def show_listening(self):
         self.animation_running = True
         self.wave_height = 20
         self.status_label.config(text="Listening...")
         
-        # Speak the status
+        # Speak the status, cutting off anything still playing from the last command
         if self.tts_enabled:
-            tts_service.say(self.status_label.cget("text"))
+            tts_service.say(self.status_label.cget("text"), priority=PRIORITY_HIGH, preempt=True)
             
         self.animate_waves()
         
-        # Start voice recognition in a separate thread to prevent UI freezing
-        self.root.after(100, self.start_voice_recognition)
-        
-    def start_voice_recognition(self):
+    def start_voice_recognition(self, preroll=None):
         from services.vtt import vtt_service
+        from services.wake_word import wake_word_listener
         import threading
         
+        def on_partial(text):
+            # Partial hypotheses arrive on the transcriber thread
+            self.root.after(0, self.show_partial_transcript, text)
+        
         def recognition_thread():
+            # Hand the microphone over from the wake word listener while recording
+            wake_word_listener.pause()
             try:
-                command = vtt_service.get_voice_command()
+                command = vtt_service.get_voice_command(on_partial=on_partial, preroll=preroll)
                 # Use after to safely update UI from thread
                 self.root.after(0, self.handle_command, command)
             except Exception as e:
                 error_message = f"Error: {str(e)}"
                 self.root.after(0, self.handle_error, error_message)
+            finally:
+                wake_word_listener.resume()
             
         thread = threading.Thread(target=recognition_thread)
         thread.daemon = True
         thread.start()
         
+    def show_partial_transcript(self, text):
+        """Show what has been heard so far while still listening"""
+        if self.status_label.cget("text") == "Processing...":
+            return
+        self.status_label.config(text=text)
+        
     def handle_command(self, command):
         self.status_label.config(text="Processing...")
         
@@ -347,19 +405,51 @@ class NagatoUI:
         # Import and use the command processor
         from services.process_command import command_processor
         
-        # Process the command
-        try:
-            response = command_processor.process_command(command)
+        # Stop showing the previous answer if it is still streaming in
+        if self.preempt_commands and self.streaming_job is not None:
+            self.streaming_job.cancel()
+        
+        # Parse the command (and launch the browser it names) while the status cue plays.
+        # Pre-launching is only safe while no other command is driving the desktop.
+        command_processor.speculate(command, prelaunch=not command_engine.pending())
+        
+        # Process the command off the Tk thread so the window and animations stay live
+        command_engine.submit(
+            command,
+            command_processor.process_command,
+            command,
+            True,
+            on_result=lambda job, response: self.show_command_result(job, command, response),
+            on_error=self.show_command_error,
+            preempt=self.preempt_commands
+        )
+        
+    def show_command_result(self, job, command, response):
+        """Called on the Tk thread when a command job finishes"""
+        if isinstance(response, str):
             # Start the typing animation
             self.start_typing_animation(command, response)
-        except Exception as e:
-            error_message = f"Error processing command: {str(e)}"
+        else:
+            # A conversational answer still being generated; show it as it arrives
+            self.start_streaming_response(command, response, job)
+        
+    def show_command_error(self, job, error):
+        error_message = f"Error processing command: {str(error)}"
+        
+        # Audio feedback for error
+        if self.tts_enabled:
+            tts_service.say(error_message)
             
-            # Audio feedback for error
-            if self.tts_enabled:
-                tts_service.say(error_message)
-                
-            self.root.after(1000, lambda: self.show_response(error_message))
+        self.root.after(1000, lambda: self.show_response(error_message))
+        
+    def update_queue_label(self, jobs):
+        """Show the running command and how many are waiting behind it"""
+        running = [job for job in jobs if job.status == RUNNING]
+        waiting = len(jobs) - len(running)
+        text = f"Working on: {running[0].description}" if running else ""
+        if waiting:
+            text += f"{' | ' if text else ''}{waiting} queued"
+        self.queue_label.config(text=text)
         
     def start_typing_animation(self, command, response):
         # Enable text widget for editing
@@ -400,6 +490,75 @@ class NagatoUI:
         # Disable text widget to make it read-only
         self.response_text.config(state=tk.DISABLED)
         
+    def start_streaming_response(self, command, deltas, job=None):
+        """Render and speak a streamed answer token by token; stops if job is cancelled"""
+        import threading
+        
+        self.streaming_job = job
+        
+        # Enable text widget for editing
+        self.response_text.config(state=tk.NORMAL)
+        self.response_text.delete(1.0, tk.END)
+        
+        # Format user message with tags for styling
+        self.response_text.insert(tk.END, "You: ", "you")
+        self.response_text.insert(tk.END, command + "\n\n", "user_text")
+        
+        # Add Nagato's response header
+        self.response_text.insert(tk.END, "Nagato: ", "nagato")
+        self.response_text.see(tk.END)
+        self.response_text.config(state=tk.DISABLED)
+        self.typing_in_progress = True
+        
+        # Stop wave animation and show we're responding
+        self.animation_running = False
+        self.status_label.config(text="Responding...")
+        
+        # Speak the status, then each sentence of the answer as soon as it is complete
+        speech = None
+        if self.tts_enabled:
+            tts_service.say(self.status_label.cget("text"))
+            speech = tts_service.speech_stream()
+        
+        def stream_thread():
+            # Tokens are read off the UI thread and handed over with after()
+            try:
+                for delta in deltas:
+                    # A newer command preempted this one mid-answer
+                    if job is not None and job.cancelled:
+                        if speech is not None:
+                            speech.cancel()
+                        break
+                    if speech is not None:
+                        speech.feed(delta)
+                    self.root.after(0, self.append_response_text, delta)
+            except Exception as e:
+                self.root.after(0, self.append_response_text, f" [Error: {str(e)}]")
+            finally:
+                if speech is not None:
+                    speech.close()
+                self.root.after(0, self.finish_streaming_response)
+        
+        thread = threading.Thread(target=stream_thread)
+        thread.daemon = True
+        thread.start()
+        
+    def append_response_text(self, text):
+        # Enable text widget for editing
+        self.response_text.config(state=tk.NORMAL)
+        self.response_text.insert(tk.END, text, "assistant_text")
+        
+        # Scroll to show the latest text
+        self.response_text.see(tk.END)
+        
+        # Make read-only again
+        self.response_text.config(state=tk.DISABLED)
+        
+    def finish_streaming_response(self):
+        self.streaming_job = None
+        self.typing_in_progress = False
+        self.root.after(500, self.show_response_complete)
+        
     def type_next_char(self):
         if self.current_char < len(self.full_response):
             # Enable text widget for editing
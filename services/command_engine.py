@@ -0,0 +1,175 @@
+import os
+import time
+import queue
+import threading
+import itertools
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobCancelled(BaseException):
+    """Raised inside a running job once it has been cancelled.
+
+    Like asyncio.CancelledError it derives from BaseException, so the broad
+    `except Exception` error handlers in the command path don't turn a
+    cancellation into a spoken error message.
+    """
+
+_current = threading.local()
+
+def current_job():
+    """The job running on this thread, or None outside the engine"""
+    return getattr(_current, "job", None)
+
+def check_cancelled():
+    """Cancellation point: raise JobCancelled if this thread's job has been cancelled"""
+    job = current_job()
+    if job is not None and job.cancelled:
+        raise JobCancelled()
+
+class CommandJob:
+    """One submitted unit of work, e.g. processing a single user command"""
+
+    def __init__(self, job_id, description, function, args, on_result, on_error):
+        self.id = job_id
+        self.description = description
+        self.function = function
+        self.args = args
+        self.on_result = on_result
+        self.on_error = on_error
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Drop the job if queued; a running job stops at its next cancellation point.
+
+        The flag is set even on a finished job, so work it handed off (such
+        as a streamed answer still being read) can watch `cancelled` too.
+        Returns False if the job itself had already finished.
+        """
+        self._cancelled.set()
+        return self.status not in (DONE, FAILED, CANCELLED)
+
+class CommandEngine:
+    """Runs commands on worker threads so the Tk event loop never blocks.
+
+    Jobs wait in a FIFO queue and run one at a time by default, since
+    commands drive a single desktop. Results and errors are delivered
+    through `dispatch`, which the UI points at root.after so callbacks run
+    on the Tk thread. Cancellation is cooperative: long-running code calls
+    check_cancelled() between steps, and a cancelled job's result is never
+    delivered.
+    """
+
+    def __init__(self):
+        self.workers = max(1, int(os.getenv('COMMAND_ENGINE_WORKERS', 1)))
+        # dispatch(callback, *args) runs a callback on the consumer's thread
+        self.dispatch = None
+        # on_queue_changed(jobs) is told about every job that is queued or running
+        self.on_queue_changed = None
+
+        self._queue = queue.Queue()
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._threads = []
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"command-engine-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, description, function, *args, on_result=None, on_error=None, preempt=False):
+        """Queue function(*args) and return its CommandJob; preempt=True cancels everything pending first"""
+        if preempt:
+            self.cancel_all()
+        job = CommandJob(next(self._ids), description, function, args, on_result, on_error)
+        with self._lock:
+            self._jobs.append(job)
+        self._queue.put(job)
+        self._notify()
+        return job
+
+    def cancel_all(self):
+        """Cancel every queued and running job"""
+        for job in self.pending():
+            job.cancel()
+        self._notify()
+
+    def pending(self):
+        """Jobs that are queued or running, oldest first"""
+        with self._lock:
+            return [job for job in self._jobs if job.status in (QUEUED, RUNNING)]
+
+    def _deliver(self, callback, *args):
+        if callback is None:
+            return
+        if self.dispatch is not None:
+            self.dispatch(callback, *args)
+        else:
+            callback(*args)
+
+    def _notify(self):
+        if self.on_queue_changed is not None:
+            self._deliver(self.on_queue_changed, self.pending())
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.monotonic()
+        with self._lock:
+            self._jobs.remove(job)
+        self._notify()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job.cancelled:
+                self._finish(job, CANCELLED)
+                continue
+
+            job.status = RUNNING
+            job.started = time.monotonic()
+            self._notify()
+            _current.job = job
+            try:
+                result = job.function(*job.args)
+            except JobCancelled:
+                self._finish(job, CANCELLED)
+                continue
+            except Exception as e:
+                job.error = e
+                self._finish(job, FAILED)
+                if job.on_error is not None:
+                    self._deliver(job.on_error, job, e)
+                else:
+                    print(f"Error running command job '{job.description}': {str(e)}")
+                continue
+            finally:
+                _current.job = None
+
+            # Cancelled after its last cancellation point: the result is stale
+            if job.cancelled:
+                self._finish(job, CANCELLED)
+                continue
+            job.result = result
+            self._finish(job, DONE)
+            self._deliver(job.on_result, job, result)
+
+# Create singleton instance
+command_engine = CommandEngine()
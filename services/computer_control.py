@@ -4,29 +4,82 @@ import time
 from typing import Optional
 from pydantic import BaseModel, Field
 import pyautogui
+from services.window_backends import create_window_manager, wait_for
+from services.intent_router import KNOWN_APPS
 
 class ComputerControl:
     def __init__(self):
         # List of common browsers for detection
         self.browsers = ['safari', 'chrome', 'firefox', 'edge', 'opera', 'brave']
+        
+        # Poll the window manager for readiness instead of sleeping a fixed time.
+        # Without a backend (e.g. on Windows) the old fixed waits are used.
+        self.window_manager = create_window_manager()
+        self.launch_timeout = float(os.getenv('APP_LAUNCH_TIMEOUT', 10))
+        # Nothing observable happens after some keystrokes (focusing the address bar),
+        # so those only get a short settle time
+        self.settle_time = float(os.getenv('UI_SETTLE_TIME', 0.05))
+    
+    def _wait_until(self, condition, deadline, fallback):
+        """Wait for condition() via the window manager, or sleep `fallback` seconds without one"""
+        if self.window_manager is None:
+            time.sleep(fallback)
+            return True
+        return wait_for(condition, deadline)
+    
+    def _active_app(self):
+        return self.window_manager.active_window()[0] if self.window_manager is not None else None
+    
+    def _wait_for_app(self, app_name, fallback, focused_before=None):
+        """Wait until app_name, or a window that took focus since the launch, is focused"""
+        # A name we can't resolve may never match its window class, so don't wait longer than we used to
+        known = app_name in KNOWN_APPS.values()
+        deadline = self.launch_timeout if known else min(self.launch_timeout, fallback)
+        
+        def ready():
+            if self.window_manager.is_ready(app_name):
+                return True
+            # Launching focuses the new window even when its class isn't the app's name
+            app = self.window_manager.active_window()[0]
+            return app is not None and app != focused_before
+        
+        ready = self._wait_until(ready, deadline, fallback)
+        if not ready:
+            print(f"{app_name} was not ready after {deadline}s")
+        return ready
+    
+    def _wait_for_browser(self, deadline):
+        """Wait until a browser window has focus; returns its title, or None"""
+        def focused_browser():
+            app, title = self.window_manager.active_window()
+            if app and any(browser in app.lower() for browser in self.browsers):
+                return title or app
+            return None
+        result = self._wait_until(focused_browser, deadline, fallback=0.5)
+        return result if isinstance(result, str) else None
     
     def open_application(self, app_name: str) -> str:
         """Open an application"""
         try:
+            # Spoken names ("chrome", "vs code") become the names the OS and window classes use
+            app_name = KNOWN_APPS.get(" ".join(app_name.lower().split()), app_name)
+            focused_before = self._active_app()
+            
             # Check if this is a browser
             is_browser = any(browser.lower() in app_name.lower() for browser in self.browsers)
             
             if os.name == 'posix':  # macOS/Linux
                 subprocess.Popen(['open', '-a', app_name])
-                # If it's a browser, give it a bit more time to open
-                wait_time = 3 if is_browser else 1
-                time.sleep(wait_time)
-                return f"Opened {app_name}"
             elif os.name == 'nt':  # Windows
                 subprocess.Popen(app_name)
-                wait_time = 3 if is_browser else 1
-                time.sleep(wait_time)
-                return f"Opened {app_name}"
+            else:
+                return "Opening apps is not implemented for this OS"
+            if self.window_manager is not None:
+                self.window_manager.launched(app_name)
+            
+            # Return as soon as the app's window has focus; browsers used to get more time to open
+            self._wait_for_app(app_name, fallback=3 if is_browser else 1, focused_before=focused_before)
+            return f"Opened {app_name}"
         except Exception as e:
             return f"Failed to open {app_name}: {str(e)}"
 
@@ -34,7 +87,7 @@ class ComputerControl:
         """Open a new tab in the current browser"""
         try:
             # Wait to ensure browser is focused
-            time.sleep(0.5)
+            title = self._wait_for_browser(deadline=2)
             
             # Use keyboard shortcut to open new tab
             if os.name == 'posix':  # macOS
@@ -42,7 +95,9 @@ class ComputerControl:
             else:  # Windows/Linux
                 pyautogui.hotkey('ctrl', 't')     # Ctrl+T for new tab
                 
-            time.sleep(0.3)  # Wait for the new tab to open
+            # Wait for the new tab to open: the window title changes to the new tab's.
+            # The deadline is the old fixed wait, so this is never slower than before.
+            self._wait_until(lambda: self.window_manager.active_window()[1] != title, 0.3, fallback=0.3)
             return "Opened new browser tab"
         except Exception as e:
             return f"Failed to open new tab: {str(e)}"
@@ -81,7 +136,7 @@ class ComputerControl:
         """Focus the search/address bar in a browser"""
         try:
             # Wait to ensure the browser is ready
-            time.sleep(0.5)
+            self._wait_for_browser(deadline=2)
             
             # Use keyboard shortcut to focus address bar
             if os.name == 'posix':  # macOS
@@ -89,7 +144,8 @@ class ComputerControl:
             else:  # Windows/Linux
                 pyautogui.hotkey('ctrl', 'l')     # Ctrl+L for address bar
                 
-            time.sleep(0.3)  # Wait for focus to complete
+            # Keystrokes are delivered in order, so typing only needs the focus change to settle
+            time.sleep(self.settle_time if self.window_manager is not None else 0.3)
             return "Focused browser address bar"
         except Exception as e:
             return f"Failed to focus address bar: {str(e)}"
@@ -97,19 +153,18 @@ class ComputerControl:
     def type_text(self, text: str, delay: float = 0.05, focus_browser: bool = False) -> str:
         """Type text into the currently active application"""
         try:
-            # Add a small delay to ensure the application is focused
-            time.sleep(0.5)
-            
-            # Focus browser address bar if requested
+            # Focus browser address bar if requested; otherwise make sure some window has focus
             if focus_browser:
                 self.focus_browser_bar()
+            else:
+                self._wait_until(lambda: self.window_manager.active_window()[0], deadline=2, fallback=0.5)
                 
             # Type the text with a delay between characters for a more natural typing effect
             pyautogui.write(text, interval=delay)
             
             # If it looks like a search query, press Enter
             if focus_browser or any(term in text.lower() for term in ["search", "what", "how", "when", "where", "who", "why"]):
-                time.sleep(0.2)
+                time.sleep(self.settle_time if self.window_manager is not None else 0.2)
                 pyautogui.press('return')
                 
             return f"Typed the text: {text}"
@@ -0,0 +1,313 @@
+import os
+import re
+import json
+import time
+import zlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from services.intent_router import KNOWN_APPS
+
+# Load environment variables
+load_dotenv()
+
+# Command fields that carry values taken from the utterance
+SLOT_FIELDS = ("app_name", "level", "text", "filename")
+
+# What each slot may look like when it is re-extracted from a new utterance
+SLOT_PATTERNS = {
+    "level": r"\d{1,3}",
+    "app_name": r"[\w.+&-]+(?: [\w.+&-]+){0,2}",
+    "filename": r"[\w.-]+"
+}
+_DEFAULT_SLOT_PATTERN = r".+?"
+
+# Words allowed in front of a slot but not part of its value ("open the vs code")
+SLOT_PREFIXES = {
+    "app_name": r"(?:(?:the|an?)\s+)?"
+}
+
+# OS names the router maps spoken app names to, lowercased
+_KNOWN_APP_NAMES = {name.lower() for name in KNOWN_APPS.values()}
+
+# Standalone numbers, the only slot a reworded utterance can fill unambiguously
+_NUMBER = re.compile(r"\b\d{1,3}\b")
+
+def _light_normalize(text):
+    """Collapse whitespace and drop trailing punctuation, keeping case for typed text"""
+    return " ".join(text.split()).strip(" .!?")
+
+def normalize_utterance(text):
+    """Exact-match key: case, punctuation and spacing don't matter"""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+def embed(text, dim=1024):
+    """Hashed bag of words, word bigrams and character trigrams, L2-normalized.
+
+    Crude next to a neural sentence encoder, but it needs no model download,
+    is stable across runs, and is plenty to tell rephrasings of the same
+    short command apart from different commands.
+    """
+    words = text.split()
+    padded = f" {text} "
+    tokens = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    tokens += [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in tokens:
+        h = zlib.crc32(token.encode("utf-8"))
+        # Signed hashing keeps collisions from only ever adding up
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class IntentCache:
+    """Persistent cache from utterances to parsed Commands.
+
+    Lookups try, in order: the exact normalized utterance, then any cached
+    utterance whose slot template (e.g. "set the volume to {level}") matches,
+    then the nearest cached utterance by cosine similarity. Slot values such
+    as app names and volume levels are always re-extracted from the new
+    utterance; a neighbour whose slots can't be re-extracted is not used.
+    A re-extracted app name must be a known app or the one cached, and a
+    neighbour with parameters that aren't slots (a level cached from "turn
+    the sound up") is never reused for different words.
+    Entries expire after a TTL and the least recently used are evicted.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('INTENT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.path = os.getenv('INTENT_CACHE_PATH', os.path.join('cache', 'intent_cache.json'))
+        self.ttl = float(os.getenv('INTENT_CACHE_TTL_HOURS', 168)) * 3600
+        self.max_entries = int(os.getenv('INTENT_CACHE_MAX_ENTRIES', 500))
+        self.similarity = float(os.getenv('INTENT_CACHE_SIMILARITY', 0.9))
+
+        self.exact_hits = 0
+        self.template_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()  # key -> entry, least recently used first
+        self._matrix = None  # embeddings of _entries in order, rebuilt when entries change
+        self._matrix_keys = []
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Error loading intent cache: {str(e)}")
+            return
+
+        now = time.time()
+        for entry in sorted(entries, key=lambda e: e["last_used"]):
+            if now - entry["created"] < self.ttl:
+                entry["pattern"] = self._compile_template(entry["template"], entry["slots"])
+                self._entries[entry["key"]] = entry
+
+    def _save(self):
+        entries = [
+            {name: value for name, value in entry.items() if name != "pattern"}
+            for entry in self._entries.values()
+        ]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving intent cache: {str(e)}")
+
+    @staticmethod
+    def _make_template(utterance, content):
+        """Replace slot values that appear in the utterance with {field} placeholders"""
+        template = utterance
+        slots = []
+        for field in SLOT_FIELDS:
+            value = content.get(field)
+            if value is None or value == "":
+                continue
+            value_pattern = re.compile(r"(?<!\w)" + re.escape(str(value)) + r"(?!\w)", re.IGNORECASE)
+            if len(value_pattern.findall(template)) == 1:
+                template = value_pattern.sub(lambda _: "{" + field + "}", template)
+                slots.append(field)
+        return template, slots
+
+    @staticmethod
+    def _compile_template(template, slots):
+        if not slots:
+            return None
+        pattern = ""
+        for piece in re.split(r"(\{\w+\})", template):
+            field = piece[1:-1]
+            if piece.startswith("{") and field in slots:
+                pattern += SLOT_PREFIXES.get(field, "") + f"(?P<{field}>{SLOT_PATTERNS.get(field, _DEFAULT_SLOT_PATTERN)})"
+            else:
+                pattern += r"\s+".join(map(re.escape, piece.split(" ")))
+        return re.compile("^" + pattern + "$", re.IGNORECASE)
+
+    @staticmethod
+    def _mask_slots(text):
+        """Embedding input: numbers and placeholders don't make utterances different"""
+        return normalize_utterance(_NUMBER.sub(" slot ", re.sub(r"\{\w+\}", " slot ", text)))
+
+    def _build_command(self, entry, slot_values):
+        # Imported here because nagato_agent imports this module
+        from services.nagato_agent import Command, CommandType
+
+        content = dict(entry["content"])
+        for field, value in slot_values.items():
+            if field == "level":
+                value = int(value)
+                if value > 100:
+                    return None
+            elif field == "app_name":
+                # Spoken names map to the OS name the same way the router maps them
+                spoken = " ".join(value.lower().split())
+                if spoken in KNOWN_APPS:
+                    value = KNOWN_APPS[spoken]
+                elif spoken == str(entry["content"].get("app_name", "")).lower():
+                    value = entry["content"]["app_name"]
+                elif spoken not in _KNOWN_APP_NAMES:
+                    # "open a new tab" fits "open {app_name}" too; only the LLM can tell
+                    return None
+            content[field] = value
+        return Command(type=CommandType(entry["type"]), content=content)
+
+    def _rebuild_matrix(self):
+        self._matrix_keys = list(self._entries)
+        if self._matrix_keys:
+            self._matrix = np.stack([embed(self._mask_slots(self._entries[key]["template"])) for key in self._matrix_keys])
+        else:
+            self._matrix = None
+
+    def _touch(self, entry):
+        entry["last_used"] = time.time()
+        self._entries.move_to_end(entry["key"])
+
+    def _expired(self, entry, now):
+        return now - entry["created"] >= self.ttl
+
+    def get(self, text):
+        """A cached Command for text with its slots re-extracted, or None"""
+        if not self.enabled:
+            return None
+        utterance = _light_normalize(text)
+        key = normalize_utterance(utterance)
+        now = time.time()
+
+        with self._lock:
+            expired = [k for k, entry in self._entries.items() if self._expired(entry, now)]
+            for k in expired:
+                del self._entries[k]
+            if expired:
+                self._matrix = None
+
+            # 1. Same words as a cached utterance
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not entry["slots"]:
+                    self._touch(entry)
+                    self.exact_hits += 1
+                    return self._build_command(entry, {})
+                match = entry["pattern"].match(utterance)
+                if match:
+                    command = self._build_command(entry, match.groupdict())
+                    if command is not None:
+                        self._touch(entry)
+                        self.exact_hits += 1
+                        return command
+
+            # 2. Same wording with different slot values ("volume to 40" -> "volume to 70")
+            for entry in reversed(self._entries.values()):
+                if entry["pattern"] is None:
+                    continue
+                match = entry["pattern"].match(utterance)
+                if match:
+                    command = self._build_command(entry, match.groupdict())
+                    if command is not None:
+                        self._touch(entry)
+                        self.template_hits += 1
+                        return command
+
+            # 3. Nearest rephrasing, if its slots can be filled from this utterance
+            if self._matrix is None or len(self._matrix_keys) != len(self._entries):
+                self._rebuild_matrix()
+            if self._matrix is not None:
+                scores = self._matrix @ embed(self._mask_slots(utterance))
+                best = int(np.argmax(scores))
+                entry = self._entries.get(self._matrix_keys[best])
+                if entry is not None and scores[best] >= self.similarity:
+                    slot_values = self._extract_loose_slots(entry, utterance)
+                    if slot_values is not None:
+                        command = self._build_command(entry, slot_values)
+                        if command is not None:
+                            self._touch(entry)
+                            self.semantic_hits += 1
+                            return command
+
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def _extract_loose_slots(entry, utterance):
+        """Slot values for a differently worded utterance; only unambiguous numbers qualify"""
+        # Values taken from words rather than slots ("up" -> level 80) may be
+        # contradicted by the new wording ("down"), which embeddings barely notice
+        if any(value not in (None, "") and field not in entry["slots"] for field, value in entry["content"].items()):
+            return None
+        if not entry["slots"]:
+            return {}
+        if entry["slots"] == ["level"]:
+            numbers = _NUMBER.findall(utterance)
+            if len(numbers) == 1:
+                return {"level": numbers[0]}
+        return None
+
+    def put(self, text, command):
+        """Remember the Command parsed for text; conversations aren't actions and aren't cached"""
+        if not self.enabled or command.type.value == "conversation":
+            return
+        utterance = _light_normalize(text)
+        key = normalize_utterance(utterance)
+        if not key:
+            return
+        template, slots = self._make_template(utterance, command.content)
+        now = time.time()
+
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "template": template,
+                "slots": slots,
+                "pattern": self._compile_template(template, slots),
+                "type": command.type.value,
+                "content": command.content,
+                "created": now,
+                "last_used": now
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self._save()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "template_hits": self.template_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses
+            }
+
+# Create singleton instance
+intent_cache = IntentCache()
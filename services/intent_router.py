@@ -0,0 +1,243 @@
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Lowercase spoken name -> name passed to the OS; anything else is title-cased
+KNOWN_APPS = {
+    "safari": "Safari",
+    "chrome": "Google Chrome",
+    "google chrome": "Google Chrome",
+    "firefox": "Firefox",
+    "edge": "Microsoft Edge",
+    "opera": "Opera",
+    "brave": "Brave Browser",
+    "spotify": "Spotify",
+    "slack": "Slack",
+    "discord": "Discord",
+    "zoom": "zoom.us",
+    "teams": "Microsoft Teams",
+    "outlook": "Microsoft Outlook",
+    "word": "Microsoft Word",
+    "excel": "Microsoft Excel",
+    "powerpoint": "Microsoft PowerPoint",
+    "vs code": "Visual Studio Code",
+    "vscode": "Visual Studio Code",
+    "visual studio code": "Visual Studio Code",
+    "xcode": "Xcode",
+    "terminal": "Terminal",
+    "finder": "Finder",
+    "notes": "Notes",
+    "calendar": "Calendar",
+    "mail": "Mail",
+    "messages": "Messages",
+    "music": "Music",
+    "photos": "Photos",
+    "preview": "Preview",
+    "calculator": "Calculator",
+    "textedit": "TextEdit",
+    "notepad": "Notepad",
+    "system settings": "System Settings",
+    "system preferences": "System Preferences",
+    "whatsapp": "WhatsApp",
+    "telegram": "Telegram"
+}
+
+# Politeness and wake phrases that don't change the intent
+_FILLER = re.compile(
+    r"^(?:(?:hey|ok|okay)\s+nagato[,.!]?\s+|nagato[,.!]?\s+)?"
+    r"(?:(?:please|can you|could you|would you|will you)\s+)*",
+    re.IGNORECASE
+)
+_TRAILING_FILLER = re.compile(r"(?:\s+(?:please|for me|now))+$", re.IGNORECASE)
+
+# Words that mean an "open" request is really a compound or a question for the LLM
+_COMPOUND_WORDS = re.compile(r"\b(?:and|then|after|before|if|tab|window|file|folder|website)\b", re.IGNORECASE)
+
+_SCREENSHOT = re.compile(
+    r"^(?:take|grab|capture|make|get)\s+(?:a\s+|the\s+)?(?:screen\s?shot|screen\s+capture|snapshot)"
+    r"(?:\s+(?:named|called|as)\s+(?P<filename>[\w.-]+))?$"
+    r"|^screen\s?shot$",
+    re.IGNORECASE
+)
+_VOLUME_LEVEL = re.compile(
+    r"^(?:(?:set|turn|change|put)\s+(?:the\s+)?volume\s+(?:up\s+|down\s+)?(?:to|at)\s+"
+    r"|(?:the\s+)?volume\s+(?:to\s+|at\s+)?)"
+    r"(?P<level>\d{1,3})\s*(?:%|percent)?$",
+    re.IGNORECASE
+)
+_VOLUME_PRESET = re.compile(
+    r"^(?P<mute>mute|unmute)(?:\s+(?:the\s+)?(?:volume|sound|audio))?$"
+    r"|^(?:(?:set\s+)?(?:the\s+)?volume\s+(?:to\s+)?|turn\s+(?:the\s+)?volume\s+(?:all\s+the\s+way\s+)?up\s+to\s+)?(?P<max>max(?:imum)?|full)(?:\s+volume)?$",
+    re.IGNORECASE
+)
+_OPEN_APP = re.compile(
+    r"^(?P<verb>open|launch|start|run)\s+(?:up\s+)?(?:the\s+)?(?P<app_name>[a-z0-9][\w .+&-]{0,40}?)"
+    r"(?:\s+app(?:lication)?)?$",
+    re.IGNORECASE
+)
+# Only "type": "write me a poem" and "enter full screen mode" are requests, not dictation
+_TYPE_TEXT = re.compile(r"^type\s+(?:out\s+|in\s+)?(?P<text>.+)$", re.IGNORECASE | re.DOTALL)
+_SEARCH = re.compile(r"^(?:search\s+(?:for\s+)?|look\s+up\s+|google\s+)(?P<text>.+)$", re.IGNORECASE | re.DOTALL)
+
+# "start" and "run" also start ordinary phrases ("start over", "run a marathon"),
+# so with them only known app names count as apps
+_AMBIGUOUS_OPEN_VERBS = ("start", "run")
+
+# Unknown app names are left to the LLM unless the threshold is lowered below this
+_UNKNOWN_APP_CONFIDENCE = 0.6
+
+# Verbs that start a command clause
+_COMMAND_VERBS = r"(?:open|launch|start|run|type|write|enter|search|look\s+up|google|set|turn|put|take|grab|capture|mute)\b"
+
+# Commas, "and" and "then" only separate clauses when a new command verb follows,
+# so "type salt and pepper" stays whole
+_CLAUSE_SPLIT = re.compile(
+    r"(?:\s*,\s*(?:and\s+then\s+|and\s+|then\s+)?|\s+(?:and\s+then|and|then)\s+)(?=" + _COMMAND_VERBS + ")",
+    re.IGNORECASE
+)
+
+# Command verbs at the start of the utterance or after a comma, "and" or "then"
+_CLAUSE_VERB = re.compile(r"(?:^|,|\band\b|\bthen\b)\s*(?:also\s+)?" + _COMMAND_VERBS, re.IGNORECASE)
+
+class IntentRouter:
+    """Deterministic fast path that turns simple commands into Commands without the LLM.
+
+    Each rule is an anchored regex with a confidence. Utterances that match
+    nothing, or only weakly (e.g. an unknown multi-word app name), are left
+    to the LLM parser; route() reports the confidence so callers can decide.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('INTENT_ROUTER_ENABLED', 'true').lower() == 'true'
+        self.threshold = float(os.getenv('INTENT_ROUTER_THRESHOLD', 0.8))
+        self.bypassed = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _strip_filler(text):
+        text = text.strip().rstrip(".!?").strip()
+        text = _FILLER.sub("", text, count=1)
+        return _TRAILING_FILLER.sub("", text).strip()
+
+    def route(self, text):
+        """Return (Command, confidence) for the best matching rule, or (None, 0.0)"""
+        # Imported here because nagato_agent imports this module
+        from services.nagato_agent import Command, CommandType
+
+        utterance = self._strip_filler(text)
+        if not utterance:
+            return None, 0.0
+
+        match = _SCREENSHOT.match(utterance)
+        if match:
+            return Command(type=CommandType.SCREENSHOT, content={"filename": match.group("filename")}), 0.95
+
+        match = _VOLUME_LEVEL.match(utterance)
+        if match:
+            level = int(match.group("level"))
+            if level > 100:
+                return None, 0.0
+            return Command(type=CommandType.VOLUME, content={"level": level}), 0.95
+
+        match = _VOLUME_PRESET.match(utterance)
+        if match:
+            # "unmute" has no level to restore, so it goes to the LLM like other relative requests
+            if match.group("mute"):
+                if match.group("mute").lower() == "unmute":
+                    return None, 0.0
+                return Command(type=CommandType.VOLUME, content={"level": 0}), 0.9
+            return Command(type=CommandType.VOLUME, content={"level": 100}), 0.9
+
+        match = _OPEN_APP.match(utterance)
+        if match:
+            spoken = " ".join(match.group("app_name").lower().split())
+            if spoken in KNOWN_APPS:
+                return Command(type=CommandType.OPEN_APP, content={"app_name": KNOWN_APPS[spoken]}), 0.95
+            if match.group("verb").lower() in _AMBIGUOUS_OPEN_VERBS or _COMPOUND_WORDS.search(spoken):
+                return None, 0.0
+            # "open <unknown name>" could be an app, a file or a figure of speech; let the LLM decide
+            return Command(type=CommandType.OPEN_APP, content={"app_name": spoken.title()}), _UNKNOWN_APP_CONFIDENCE
+
+        match = _TYPE_TEXT.match(utterance)
+        if match:
+            content = {"text": match.group("text").strip(), "delay": 0.05, "focus_browser": False}
+            return Command(type=CommandType.TYPE_TEXT, content=content), 0.9
+
+        match = _SEARCH.match(utterance)
+        if match:
+            content = {"text": match.group("text").strip(), "delay": 0.05, "focus_browser": True}
+            return Command(type=CommandType.TYPE_TEXT, content=content), 0.85
+
+        return None, 0.0
+
+    def parse(self, text):
+        """The routed Command if it clears the confidence threshold, else None (use the LLM)"""
+        if not self.enabled:
+            return None
+        try:
+            command, confidence = self.route(text)
+        except Exception as e:
+            print(f"Error routing command locally: {str(e)}")
+            command, confidence = None, 0.0
+
+        with self._lock:
+            if command is not None and confidence >= self.threshold:
+                self.bypassed += 1
+                return command
+            self.fallbacks += 1
+            return None
+
+    def split_clauses(self, text):
+        """Split a compound utterance into its command clauses"""
+        return [clause for clause in _CLAUSE_SPLIT.split(self._strip_filler(text)) if clause.strip()]
+
+    def looks_compound(self, text):
+        """True when the utterance asks for more than one action, whether or not it parses locally"""
+        return len(_CLAUSE_VERB.findall(self._strip_filler(text))) > 1
+
+    def parse_compound(self, text):
+        """Commands for every clause of a compound utterance, or None unless all of them route confidently.
+
+        Only a success is counted; on None the caller goes on to parse(),
+        which counts the command's outcome, so each command is counted once.
+        """
+        if not self.enabled:
+            return None
+        clauses = self.split_clauses(text)
+        if len(clauses) < 2:
+            return None
+
+        steps = []
+        try:
+            for clause in clauses:
+                command, confidence = self.route(clause)
+                if command is None or confidence < self.threshold:
+                    steps = None
+                    break
+                steps.append(command)
+        except Exception as e:
+            print(f"Error routing compound command locally: {str(e)}")
+            steps = None
+
+        if steps:
+            with self._lock:
+                self.bypassed += 1
+        return steps
+
+    def stats(self):
+        """How many commands skipped the LLM, and the share of all routed attempts"""
+        with self._lock:
+            total = self.bypassed + self.fallbacks
+            return {
+                "bypassed": self.bypassed,
+                "fallbacks": self.fallbacks,
+                "bypass_rate": self.bypassed / total if total else 0.0
+            }
+
+# Create singleton instance
+intent_router = IntentRouter()
@@ -1,15 +1,19 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from enum import Enum
 from datetime import datetime
+from services.openai_client import get_client
 from services.computer_control import ComputerControl, OpenAppRequest, VolumeRequest, ScreenshotRequest, TypeTextRequest
-from openai import OpenAI
 import os
 import json
+import time
 import random
 
 # Import the TTS service
 from services.tts import tts_service
+from services.intent_router import intent_router
+from services.intent_cache import intent_cache
+from services.command_engine import check_cancelled
 
 class CommandType(Enum):
     OPEN_APP = "open_app"
@@ -28,10 +32,18 @@ class NagatoResponse(BaseModel):
     success: bool = True
     voice_feedback: Optional[str] = None  # Added field for voice feedback
 
+# Plan tools -> command type and the request model that validates their arguments
+PLAN_STEPS = {
+    "open_application": (CommandType.OPEN_APP, OpenAppRequest),
+    "adjust_volume": (CommandType.VOLUME, VolumeRequest),
+    "take_screenshot": (CommandType.SCREENSHOT, ScreenshotRequest),
+    "type_text": (CommandType.TYPE_TEXT, TypeTextRequest)
+}
+
 class NagatoAgent:
     def __init__(self):
         self.computer = ComputerControl()
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_client("parse")
         # Check if TTS is enabled
         self.tts_enabled = os.getenv('TTS_ENABLED', 'true').lower() == 'true'
         
@@ -71,15 +83,72 @@ class NagatoAgent:
             "Sorry about that: {}"
         ]
         
+        # Timing of each step of the most recently executed plan
+        self.last_plan_timings = []
+        
     def process_command(self, text: str) -> NagatoResponse:
         """Process natural language command and execute appropriate action"""
-        try:
-            # Use LLM to parse the command and determine intent
-            parsed = self.parse_command(text)
+        # Parse locally when possible, otherwise with one LLM call for the whole plan, then run it
+        return self.execute_plan(self.parse_plan(text), text)
+    
+    def execute_plan(self, steps: List[Command], text: str = "", speculation=None) -> NagatoResponse:
+        """Run plan steps in order, timing each one and stopping at the first failure.
+
+        speculation is the command's Speculation, whose pre-launched app an
+        OPEN_APP step reuses instead of opening it again.
+        """
+        responses = []
+        self.last_plan_timings = []
+        browser_opened = False
+        for index, step in enumerate(steps):
+            # A newer command may have aborted this one between steps
+            check_cancelled()
+            
+            # Text typed right after opening a browser goes into a fresh tab's address bar
+            if step.type == CommandType.TYPE_TEXT and browser_opened:
+                self.computer.open_new_browser_tab()
+                step = Command(type=step.type, content={**step.content, "focus_browser": True})
+                # Later typing steps go into this tab rather than opening more
+                browser_opened = False
             
+            start = time.perf_counter()
+            response = self.execute_command(step, text, speculation)
+            elapsed = time.perf_counter() - start
+            self.last_plan_timings.append({
+                "step": index + 1,
+                "type": step.type.value,
+                "seconds": elapsed,
+                "success": response.success
+            })
+            print(f"Step {index + 1}/{len(steps)} {step.type.value}: {elapsed:.2f}s")
+            
+            responses.append(response)
+            if not response.success:
+                break
+            # A browser opened now gets a fresh tab for the next typing step, even after e.g. a volume step
+            if step.type == CommandType.OPEN_APP:
+                browser_opened = any(browser in step.content["app_name"].lower() for browser in self.computer.browsers)
+        
+        if len(responses) == 1:
+            return responses[0]
+        actions = [response.action_taken for response in responses if response.action_taken]
+        feedback = [response.voice_feedback for response in responses if response.voice_feedback]
+        return NagatoResponse(
+            message=" ".join(response.message for response in responses),
+            action_taken="\n".join(actions) if actions else None,
+            success=all(response.success for response in responses),
+            voice_feedback=" ".join(feedback) if feedback else None
+        )
+    
+    def execute_command(self, parsed: Command, text: str = "", speculation=None) -> NagatoResponse:
+        """Execute an already parsed command against the computer; text is the original utterance"""
+        try:
             if parsed.type == CommandType.OPEN_APP:
                 request = OpenAppRequest(**parsed.content)
-                result = self.computer.open_application(request.app_name)
+                # The app may already have been launched while the command was being parsed
+                result = speculation.launch_result(request.app_name) if speculation else None
+                if result is None:
+                    result = self.computer.open_application(request.app_name)
                 
                 # Create conversational response message
                 message = random.choice(self.open_app_responses).format(result)
@@ -142,8 +211,9 @@ class NagatoAgent:
                 # Check if this is browser-related for automatic focus
                 browsers = ['safari', 'chrome', 'firefox', 'edge', 'opera', 'brave']
                 
-                # Auto-detect if this is likely a search query
-                is_search_query = any(term in text.lower() for term in ['search', 'look up', 'find', 'google', 'what', 'how', 'when', 'where', 'who', 'why'])
+                # Auto-detect if this step's own text is likely a search query; the whole
+                # utterance may hold other steps ("type my list, then search for recipes")
+                is_search_query = any(term in request.text.lower() for term in ['search', 'look up', 'find', 'google', 'what', 'how', 'when', 'where', 'who', 'why'])
                 
                 # Set focus_browser parameter if provided or if this looks like a search query
                 focus_browser = request.focus_browser or is_search_query
@@ -196,7 +266,26 @@ class NagatoAgent:
             )
 
     def parse_command(self, text: str) -> Command:
-        """Use LLM to parse the command and determine the intent"""
+        """Parse the command and return the first step of its plan"""
+        return self.parse_plan(text)[0]
+    
+    def parse_plan(self, text: str) -> List[Command]:
+        """Parse the command into an ordered list of steps, using the LLM only when needed"""
+        
+        # Compound commands whose every clause is simple are split and parsed locally
+        steps = intent_router.parse_compound(text)
+        if steps:
+            return steps
+        
+        # Simple commands ("open spotify", "volume 40") are parsed locally without a round-trip
+        routed = intent_router.parse(text)
+        if routed is not None:
+            return [routed]
+        
+        # Repeats and rephrasings of commands the LLM has already parsed
+        cached = intent_cache.get(text)
+        if cached is not None:
+            return [cached]
         
         function_descriptions = {
             "functions": [
@@ -276,7 +365,7 @@ class NagatoAgent:
                 model=os.getenv('LLM_MODEL', 'gpt-4'),
                 messages=[
                     {"role": "system", "content": """You are a command parser for a computer control system. 
-                    Analyze user commands and map them to the appropriate function call. 
+                    Analyze user commands and map them to the appropriate function calls. 
                     For volume commands, understand relative terms (louder/quieter) and convert them to appropriate levels.
                     
                     For typing commands:
@@ -284,56 +373,45 @@ class NagatoAgent:
                     - If a command mentions searching or looking up info, use type_text with focus_browser=true.
                     - If a command contains search terms like "what", "how", "when", etc., use type_text with focus_browser=true.
                     
-                    For compound commands (e.g. "open <app> and type <text>"), only parse the first part of the command.
-                    Respond only with the function call, no other text."""},
+                    For compound commands (e.g. "open <app>, search for <text> and set the volume to 30"),
+                    call one function per action, in the order they should happen.
+                    Respond only with the function calls, no other text."""},
                     {"role": "user", "content": text}
                 ],
-                functions=function_descriptions["functions"],
-                function_call="auto"
+                # One tool call per step, so a whole plan costs a single round-trip
+                tools=[{"type": "function", "function": function} for function in function_descriptions["functions"]],
+                tool_choice="auto"
             )
 
-            # Extract the function call
-            if response.choices[0].message.function_call:
-                func_name = response.choices[0].message.function_call.name
-                func_args = json.loads(response.choices[0].message.function_call.arguments)
-
-                # Map to appropriate command type
-                if func_name == "open_application":
-                    return Command(
-                        type=CommandType.OPEN_APP,
-                        content={"app_name": func_args["app_name"]}
-                    )
-                elif func_name == "adjust_volume":
-                    return Command(
-                        type=CommandType.VOLUME,
-                        content={"level": func_args["level"]}
-                    )
-                elif func_name == "take_screenshot":
-                    return Command(
-                        type=CommandType.SCREENSHOT,
-                        content={"filename": func_args.get("filename")}
-                    )
-                elif func_name == "type_text":
-                    return Command(
-                        type=CommandType.TYPE_TEXT,
-                        content={
-                            "text": func_args["text"],
-                            "delay": func_args.get("delay", 0.05),
-                            "focus_browser": func_args.get("focus_browser", False)
-                        }
-                    )
+            # Validate each tool call with its request model. Later steps depend on earlier
+            # ones (typing goes into the app just opened), so one bad step rejects the plan
+            steps = []
+            for tool_call in response.choices[0].message.tool_calls or []:
+                if tool_call.function.name not in PLAN_STEPS:
+                    print(f"Rejecting plan with unknown step: {tool_call.function.name}")
+                    return [Command(type=CommandType.CONVERSATION, content={})]
+                command_type, request_model = PLAN_STEPS[tool_call.function.name]
+                try:
+                    request = request_model.model_validate(json.loads(tool_call.function.arguments))
+                except (ValidationError, ValueError) as e:
+                    print(f"Rejecting plan with invalid {tool_call.function.name} step: {str(e)}")
+                    return [Command(type=CommandType.CONVERSATION, content={})]
+                steps.append(Command(type=command_type, content=request.model_dump()))
 
-            return Command(
-                type=CommandType.CONVERSATION,
-                content={}
-            )
+            if not steps:
+                steps = [Command(type=CommandType.CONVERSATION, content={})]
+            # Only single actions are cached: their slots can be re-extracted reliably, and a cached
+            # "conversation" would shadow real commands that happen to be worded similarly
+            if len(steps) == 1 and steps[0].type != CommandType.CONVERSATION:
+                intent_cache.put(text, steps[0])
+            return steps
 
         except Exception as e:
             print(f"Error parsing command: {str(e)}")
-            return Command(
+            return [Command(
                 type=CommandType.CONVERSATION,
                 content={}
-            )
+            )]
 
 # Create singleton instance
 nagato_agent = NagatoAgent() 
\ No newline at end of file
@@ -0,0 +1,208 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+import httpx
+from openai import OpenAI
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Responses worth another attempt: rate limits and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.ReadError)
+
+# Per-call-type timeouts in seconds: a parse should be quick, a spoken answer may take longer
+CALL_TIMEOUTS = {
+    "default": float(os.getenv('OPENAI_TIMEOUT', 30)),
+    "parse": float(os.getenv('OPENAI_PARSE_TIMEOUT', 10)),
+    "chat": float(os.getenv('OPENAI_CHAT_TIMEOUT', 30)),
+    "tts": float(os.getenv('OPENAI_TTS_TIMEOUT', 15))
+}
+
+# Latency samples kept per endpoint for the percentiles
+_SAMPLES = 200
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class RetryBudget:
+    """Token bucket that caps retries to a share of recent requests.
+
+    Every request deposits `ratio` tokens and every retry spends one, so
+    during an outage retries stay around 20% extra load instead of
+    multiplying it by the per-request retry count.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """Spend a token for one retry; False when the budget is exhausted"""
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+class LatencyStats:
+    """Per-endpoint request counts and time-to-headers percentiles"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, error=False, retried=False):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                "count": 0,
+                "errors": 0,
+                "retries": 0,
+                "samples": deque(maxlen=_SAMPLES)
+            })
+            stats["count"] += 1
+            if error:
+                stats["errors"] += 1
+            if retried:
+                stats["retries"] += 1
+            stats["samples"].append(seconds)
+
+    def summary(self):
+        with self._lock:
+            summary = {}
+            for endpoint, stats in self._endpoints.items():
+                samples = sorted(stats["samples"])
+                summary[endpoint] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "retries": stats["retries"],
+                    "p50": samples[len(samples) // 2] if samples else None,
+                    "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else None
+                }
+            return summary
+
+class RetryTransport(httpx.BaseTransport):
+    """httpx transport that retries transient failures with full-jitter backoff.
+
+    Retries happen before the response body is read, so streamed chat and
+    speech responses are only retried while nothing has been consumed yet.
+    """
+
+    def __init__(self, transport, stats, max_retries=2, backoff=0.5, max_backoff=8.0, budget=None, endpoint_retries=None):
+        self.transport = transport
+        self.stats = stats
+        self.max_retries = max_retries
+        # Path suffix -> retry count for endpoints with their own policy
+        self.endpoint_retries = endpoint_retries or {}
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget or RetryBudget()
+
+    def _delay(self, attempt, response=None):
+        # Honour the server's Retry-After when it gives one in seconds
+        if response is not None:
+            try:
+                return min(self.max_backoff, float(response.headers.get("retry-after", "")))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def handle_request(self, request):
+        endpoint = request.url.path
+        max_retries = next(
+            (retries for suffix, retries in self.endpoint_retries.items() if endpoint.endswith(suffix)),
+            self.max_retries
+        )
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.transport.handle_request(request)
+            except RETRY_EXCEPTIONS:
+                self.stats.record(endpoint, time.monotonic() - start, error=True, retried=attempt > 0)
+                if attempt >= max_retries or not self.budget.withdraw():
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+                continue
+
+            failed = response.status_code in RETRY_STATUSES
+            self.stats.record(endpoint, time.monotonic() - start, error=failed, retried=attempt > 0)
+            if not failed or attempt >= max_retries or not self.budget.withdraw():
+                return response
+            delay = self._delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.transport.close()
+
+class OpenAIClientFactory:
+    """One OpenAI client on one pooled HTTP connection for the whole app.
+
+    Chat, parse and speech calls share the pool, so a kept-alive connection
+    (HTTP/2 when the h2 package is installed) saves a TLS handshake on each
+    call after the first. The SDK's own retries are turned off in favour of
+    RetryTransport, which jitters its backoff and draws on a shared budget.
+    """
+
+    def __init__(self):
+        self.stats = LatencyStats()
+        self.http2 = os.getenv('OPENAI_HTTP2', 'true').lower() == 'true' and _http2_available()
+        limits = httpx.Limits(
+            max_connections=int(os.getenv('OPENAI_MAX_CONNECTIONS', 10)),
+            max_keepalive_connections=int(os.getenv('OPENAI_MAX_KEEPALIVE', 5)),
+            keepalive_expiry=float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 30))
+        )
+        transport = RetryTransport(
+            httpx.HTTPTransport(http2=self.http2, limits=limits),
+            self.stats,
+            max_retries=int(os.getenv('OPENAI_MAX_RETRIES', 2)),
+            # Speech has a fast local fallback (TTS_REMOTE_TIMEOUT), which retries would only delay
+            endpoint_retries={"/audio/speech": int(os.getenv('OPENAI_TTS_RETRIES', 0))},
+            budget=RetryBudget(ratio=float(os.getenv('OPENAI_RETRY_BUDGET', 0.2)))
+        )
+        self.http_client = httpx.Client(transport=transport, timeout=CALL_TIMEOUTS["default"])
+        self.client = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, call_type="default"):
+        """The shared client with the timeout for call_type ("parse", "chat", "tts")"""
+        with self._lock:
+            if self.client is None:
+                self.client = OpenAI(
+                    api_key=os.getenv('OPENAI_API_KEY'),
+                    http_client=self.http_client,
+                    max_retries=0,
+                    timeout=CALL_TIMEOUTS["default"]
+                )
+            if call_type not in self._clients:
+                timeout = CALL_TIMEOUTS.get(call_type, CALL_TIMEOUTS["default"])
+                self._clients[call_type] = self.client.with_options(timeout=timeout)
+            return self._clients[call_type]
+
+    def latency_stats(self):
+        """Per-endpoint counts, errors, retries and p50/p95 time to response headers"""
+        return self.stats.summary()
+
+# Create singleton instance
+openai_clients = OpenAIClientFactory()
+
+def get_client(call_type="default"):
+    return openai_clients.get(call_type)
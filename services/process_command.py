@@ -1,90 +1,61 @@
 import os
 import time
-from openai import OpenAI
 from dotenv import load_dotenv
 
 # Import TTS service
 from services.tts import tts_service
+from services.openai_client import get_client
+from services.intent_router import intent_router, KNOWN_APPS
+from services.command_engine import check_cancelled
+from services.speculation import speculator
 
 load_dotenv()
 
 class CommandProcessor:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_client("chat")
         self.model = os.getenv('LLM_MODEL', 'gpt-4')
         self.browsers = ['safari', 'chrome', 'firefox', 'edge', 'opera', 'brave']
+        # Searches that don't name a browser go to this one
+        self.default_browser = "Safari"
         # Check if TTS is enabled
         self.tts_enabled = os.getenv('TTS_ENABLED', 'true').lower() == 'true'
+        # Stream conversational answers token by token when the caller can render them
+        self.streaming = os.getenv('LLM_STREAMING', 'true').lower() == 'true'
+        
+        # Feedback lines that never change, pre-rendered by the TTS phrase bank
+        self.fixed_phrases = (
+            [f"Opening {browser.capitalize()}" for browser in self.browsers] +
+            [f"Opening new tab in {browser.capitalize()}" for browser in self.browsers]
+        )
+
+    def process_command(self, command_text, stream=False):
+        """Execute a command and return the response text.
 
-    def process_command(self, command_text):
+        With stream=True, a conversational answer is returned as a generator
+        of text deltas instead, so the caller can show and speak it while
+        the model is still writing it.
+        """
+        # Work started by speculate() when the transcript came in
+        speculation = speculator.take(command_text)
         try:
             # Use Nagato agent to process the command
-            from services.nagato_agent import nagato_agent
+            from services.nagato_agent import nagato_agent, CommandType
             
             # Check for browser-related and compound commands
             command_lower = command_text.lower()
-            is_browser_command = any(browser in command_lower for browser in self.browsers)
-            is_search_command = any(term in command_lower for term in ['search', 'look up', 'find', 'google'])
+            route = self._keyword_route(command_lower)
+            steps = None
             
-            # Check for compound commands like "open Safari and type what time is it in Ottawa"
-            if ("open" in command_lower or "launch" in command_lower) and ("type" in command_lower or "search" in command_lower or "look up" in command_lower) and "and" in command_lower:
-                # Parse the compound command
-                compound_result = self._parse_compound_command(command_text)
-                
-                if compound_result:
-                    app_name, text_to_type = compound_result
-                    is_browser = any(browser in app_name.lower() for browser in self.browsers)
-                    
-                    # Create response message for opening app
-                    opening_message = f"Opening {app_name}"
-                    
-                    # Audio feedback using exact message
-                    if self.tts_enabled:
-                        tts_service.say(opening_message)
-                    
-                    # First open the application
-                    open_response = nagato_agent.process_command(f"open {app_name}")
-                    
-                    # For browsers, open a new tab first
-                    if is_browser:
-                        # Create new tab message
-                        new_tab_message = f"Opening new tab in {app_name}"
-                        
-                        # Audio feedback using exact message
-                        if self.tts_enabled:
-                            tts_service.say(new_tab_message)
-                            
-                        # Open a new tab
-                        nagato_agent.computer.open_new_browser_tab()
-                        
-                        # Create typing message
-                        action_verb = "Searching for" if any(term in text_to_type.lower() for term in ["what", "how", "when", "where", "who", "why"]) else "Typing"
-                        typing_message = f"{action_verb} {text_to_type}"
-                        
-                        # Audio feedback using exact message
-                        if self.tts_enabled:
-                            tts_service.say(typing_message)
-                            
-                        # Use modified command to ensure focus_browser=True
-                        type_response = nagato_agent.computer.type_text(text_to_type, focus_browser=True)
-                    else:
-                        # Create typing message for non-browser
-                        typing_message = f"Typing {text_to_type} in {app_name}"
-                        
-                        # Audio feedback using exact message
-                        if self.tts_enabled:
-                            tts_service.say(typing_message)
-                            
-                        # Regular typing for non-browser apps
-                        type_response = nagato_agent.process_command(f"type {text_to_type}")
-                    
-                    # Final response message
-                    final_response = f"{open_response.message} I opened a new tab and typed '{text_to_type}' for you."
-                    
-                    return final_response
+            # Multi-step commands like "open Safari and type what time is it in Ottawa" are planned
+            # in one go: locally when every clause is simple, otherwise with a single LLM call
+            if intent_router.looks_compound(command_text):
+                steps = self._plan(command_text, speculation)
+                if steps[0].type != CommandType.CONVERSATION:
+                    return self._run_steps(self._with_browser(steps), command_text, speculation)
             
             # Special handling for browser commands that don't explicitly mention "open"
-            elif is_browser_command and (is_search_command or "go to" in command_lower or "visit" in command_lower or "open" in command_lower):
+            if route == "browser":
                 # Extract the browser name
                 browser_name = None
                 for browser in self.browsers:
@@ -101,7 +72,7 @@ class CommandProcessor:
                         tts_service.say(opening_message)
                         
                     # Open the browser
-                    open_response = nagato_agent.process_command(f"open {browser_name}")
+                    open_response = self._open_app(browser_name, speculation)
                     
                     # Create new tab message
                     new_tab_message = f"Opening new tab in {browser_name}"
@@ -137,9 +108,9 @@ class CommandProcessor:
                     return final_response
             
             # Special handling for "search" commands without explicit "open" 
-            elif is_search_command and not is_browser_command:
+            elif route == "search":
                 # If they just say "search X" without specifying browser, we'll use default browser
-                default_browser = "Safari"  # Default to Safari
+                default_browser = self.default_browser
                 
                 # Extract the search query
                 search_query = command_text
@@ -156,7 +127,7 @@ class CommandProcessor:
                     tts_service.say(opening_message)
                     
                 # First open the browser
-                open_response = nagato_agent.process_command(f"open {default_browser}")
+                open_response = self._open_app(default_browser, speculation)
                 
                 # Create new tab message
                 new_tab_message = f"Opening new tab in {default_browser}"
@@ -182,8 +153,11 @@ class CommandProcessor:
                 final_response = f"{open_response.message} I opened a new tab and searched for '{search_query}' for you."
                 return final_response
             
-            # Process normal command if it's not a special case
-            response = nagato_agent.process_command(command_text)
+            # Process normal command if it's not a special case, reusing the compound plan if there was one
+            if steps is None:
+                steps = self._plan(command_text, speculation)
+            response = nagato_agent.execute_plan(steps, command_text, speculation)
+            check_cancelled()
             
             if response.success:
                 if response.action_taken:
@@ -191,6 +165,8 @@ class CommandProcessor:
                 return response.message
             else:
                 # Fall back to conversational response if command fails
+                if stream and self.streaming:
+                    return self.stream_conversation_response(command_text)
                 return self._get_conversation_response(command_text)
                 
         except Exception as e:
@@ -203,7 +179,141 @@ class CommandProcessor:
                 tts_service.say(error_message)
                 
             return error_message
+        finally:
+            # Drop whatever speculative work this command didn't use
+            speculator.finish(speculation)
+            
+    def speculate(self, command_text, prelaunch=True):
+        """Start parsing a command, and launching the browser it names, before its job runs.
+
+        Called the moment the transcript is final, in parallel with the status
+        cue; process_command picks the work up by matching the text.
+        """
+        command_lower = command_text.lower()
+        route = self._keyword_route(command_lower)
+        # The keyword shortcuts never consult the parser
+        parse = route is None or intent_router.looks_compound(command_text)
+        
+        # A named browser plus an open or search verb is confident enough to launch it now
+        app_name = None
+        if prelaunch and route == "browser":
+            browser = next(browser for browser in self.browsers if browser in command_lower)
+            app_name = KNOWN_APPS.get(browser, browser.capitalize())
+        return speculator.start(command_text, parse=parse, app_name=app_name)
+    
+    def _keyword_route(self, command_lower):
+        """Which keyword shortcut handles the command: "browser", "search" or None"""
+        is_browser_command = any(browser in command_lower for browser in self.browsers)
+        is_search_command = any(term in command_lower for term in ['search', 'look up', 'find', 'google'])
+        if is_browser_command and (is_search_command or "go to" in command_lower or "visit" in command_lower or "open" in command_lower):
+            return "browser"
+        if is_search_command and not is_browser_command:
+            return "search"
+        return None
+    
+    def _plan(self, command_text, speculation=None):
+        """The plan parsed ahead of time for this command, or parse it now"""
+        from services.nagato_agent import nagato_agent
+        
+        steps = speculation.plan() if speculation else None
+        return steps if steps is not None else nagato_agent.parse_plan(command_text)
+    
+    def _open_app(self, app_name, speculation=None):
+        """Open an app directly, without re-parsing an "open ..." string"""
+        from services.nagato_agent import nagato_agent, Command, CommandType
+        
+        app_name = KNOWN_APPS.get(app_name.lower(), app_name)
+        return nagato_agent.execute_command(Command(type=CommandType.OPEN_APP, content={"app_name": app_name}), speculation=speculation)
+    
+    def _open_and_type(self, app_name, text_to_type, speculation=None):
+        """Open an app and type into it; browsers get a new tab and a focused address bar"""
+        from services.nagato_agent import nagato_agent, Command, CommandType
+        
+        # Speak browser names the way the fixed phrases do, so they come from the phrase bank
+        browser = next((browser for browser in self.browsers if browser in app_name.lower()), None)
+        spoken_name = browser.capitalize() if browser else app_name
+        
+        # Create response message for opening app
+        opening_message = f"Opening {spoken_name}"
+        
+        # Audio feedback using exact message
+        if self.tts_enabled:
+            tts_service.say(opening_message)
+        
+        # First open the application
+        open_response = self._open_app(app_name, speculation)
+        check_cancelled()
+        
+        # For browsers, open a new tab first
+        if browser:
+            # Create new tab message
+            new_tab_message = f"Opening new tab in {spoken_name}"
+            
+            # Audio feedback using exact message
+            if self.tts_enabled:
+                tts_service.say(new_tab_message)
+                
+            # Open a new tab
+            nagato_agent.computer.open_new_browser_tab()
+            
+            # Create typing message
+            action_verb = "Searching for" if any(term in text_to_type.lower() for term in ["what", "how", "when", "where", "who", "why"]) else "Typing"
+            typing_message = f"{action_verb} {text_to_type}"
             
+            # Audio feedback using exact message
+            if self.tts_enabled:
+                tts_service.say(typing_message)
+                
+            # Focus the address bar so the text becomes a search
+            nagato_agent.computer.type_text(text_to_type, focus_browser=True)
+            
+            return f"{open_response.message} I opened a new tab and typed '{text_to_type}' for you."
+        
+        # Create typing message for non-browser
+        typing_message = f"Typing {text_to_type} in {app_name}"
+        
+        # Audio feedback using exact message
+        if self.tts_enabled:
+            tts_service.say(typing_message)
+            
+        # Regular typing for non-browser apps
+        nagato_agent.execute_command(Command(
+            type=CommandType.TYPE_TEXT,
+            content={"text": text_to_type, "delay": 0.05, "focus_browser": False}
+        ))
+        
+        return f"{open_response.message} I typed '{text_to_type}' for you."
+    
+    def _with_browser(self, steps):
+        """Open the default browser before a search step that has no browser to type into"""
+        from services.nagato_agent import Command, CommandType
+        
+        planned = []
+        browser_open = False
+        for step in steps:
+            if step.type == CommandType.OPEN_APP:
+                browser_open = any(browser in step.content["app_name"].lower() for browser in self.browsers)
+            elif step.type == CommandType.TYPE_TEXT and step.content.get("focus_browser") and not browser_open:
+                # execute_plan opens a new tab for text typed right after a browser is opened
+                app_name = KNOWN_APPS.get(self.default_browser.lower(), self.default_browser)
+                planned.append(Command(type=CommandType.OPEN_APP, content={"app_name": app_name}))
+                browser_open = True
+            planned.append(step)
+        return planned
+    
+    def _run_steps(self, steps, command_text, speculation=None):
+        """Execute a parsed multi-step plan in order, stopping at the first failure"""
+        from services.nagato_agent import nagato_agent, CommandType
+        
+        # The most common flow, open an app then type into it, keeps its spoken cues
+        if len(steps) == 2 and steps[0].type == CommandType.OPEN_APP and steps[1].type == CommandType.TYPE_TEXT:
+            return self._open_and_type(steps[0].content["app_name"], steps[1].content["text"], speculation)
+        
+        response = nagato_agent.execute_plan(steps, command_text, speculation)
+        if response.action_taken:
+            return f"{response.message}\n{response.action_taken}"
+        return response.message
+    
     def _extract_search_or_url(self, command_text, browser_name):
         """Extract search query or URL from command"""
         try:
@@ -241,62 +351,45 @@ class CommandProcessor:
             print(f"Error extracting search/URL: {str(e)}")
             return None
             
-    def _parse_compound_command(self, command_text):
-        """Parse compound commands like 'open Safari and type what time is it in Ottawa'"""
-        try:
-            system_message = """You need to extract two pieces of information from a compound command:
-            1. The application name (after "open" or "launch")
-            2. The text to type or search (after "type", "search", "look up" or similar keywords)
-            
-            Respond with only these two items in the format: 
-            application_name|text_to_type
-            
-            For example: 
-            Input: "open Safari and type what time is it in Ottawa"
-            Output: "Safari|what time is it in Ottawa"
-            
-            Input: "launch Chrome and search for best restaurants in NYC"
-            Output: "Chrome|best restaurants in NYC"
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": command_text}
-                ],
-                temperature=0.3,
-                max_tokens=100
-            )
-            
-            parsed_result = response.choices[0].message.content.strip()
-            if "|" in parsed_result:
-                app_name, text_to_type = parsed_result.split("|", 1)
-                return app_name.strip(), text_to_type.strip()
-            return None
-            
-        except Exception as e:
-            print(f"Error parsing compound command: {str(e)}")
-            return None
-
-    def _get_conversation_response(self, command_text):
-        """Get conversational response when command processing fails"""
+    def _conversation_messages(self, command_text):
         system_message = """You are Nagato, a friendly and capable assistant. 
         Respond naturally to commands about controlling the computer, without mentioning 
         that you're an AI. Keep responses conversational and direct, as if you're 
         having a casual chat."""
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": command_text}
+        ]
 
+    def _get_conversation_response(self, command_text):
+        """Get conversational response when command processing fails"""
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": command_text}
-            ],
+            messages=self._conversation_messages(command_text),
             temperature=0.7,
             max_tokens=150
         )
 
         return response.choices[0].message.content
 
+    def stream_conversation_response(self, command_text):
+        """Yield a conversational response as text deltas while the model generates it"""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._conversation_messages(command_text),
+            temperature=0.7,
+            max_tokens=150,
+            stream=True
+        )
+
+        try:
+            for chunk in response:
+                # The final chunk carries only the finish reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # A cancelled answer stops reading early; give the connection back to the shared pool
+            response.response.close()
+
 # Create singleton instance
 command_processor = CommandProcessor()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dotenv import load_dotenv
+from services.command_engine import check_cancelled
+from services.intent_router import KNOWN_APPS
+
+# Load environment variables
+load_dotenv()
+
+# Speculations kept for commands that haven't started yet; older ones are dropped
+MAX_PENDING = 4
+
+def _wait(future):
+    """future.result(), but giving up as soon as the current command job is cancelled"""
+    while True:
+        check_cancelled()
+        try:
+            return future.result(timeout=0.1)
+        except FutureTimeout:
+            continue
+
+class Speculation:
+    """Work started for one utterance the moment its transcript is final.
+
+    The plan is parsed and the likely app launched while the status cue
+    plays and the command job waits its turn. The job then reconciles:
+    it uses the plan, and the launch only if the plan opens the same app.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.created = time.monotonic()
+        self.claimed = None
+        self.plan_future = None
+        self.plan_seconds = None
+        self.app_name = None
+        self.launch_future = None
+        self.plan_used = False
+        self.launch_used = False
+
+    def plan(self):
+        """The speculatively parsed plan (waiting for it if needed), or None if there isn't one"""
+        if self.plan_future is None:
+            return None
+        try:
+            steps = _wait(self.plan_future)
+        except Exception as e:
+            print(f"Error in speculative parse: {str(e)}")
+            return None
+        self.plan_used = True
+        return steps
+
+    def launch_result(self, app_name):
+        """Result of the speculative launch if it opened app_name, else None (open it normally)"""
+        # "Chrome" from the parser and "Google Chrome" from the heuristic are the same app
+        if self.launch_future is None or KNOWN_APPS.get(app_name.lower(), app_name).lower() != self.app_name.lower():
+            return None
+        try:
+            result = _wait(self.launch_future)
+        except Exception as e:
+            print(f"Error in speculative launch of {self.app_name}: {str(e)}")
+            return None
+        self.launch_used = True
+        return result
+
+    def cancel(self):
+        """Stop work that hasn't started; returns True if something was still queued"""
+        cancelled = False
+        for future in (self.plan_future, self.launch_future):
+            if future is not None and future.cancel():
+                cancelled = True
+        return cancelled
+
+class Speculator:
+    """Starts intent parsing and app launches ahead of the command job.
+
+    Speculations are matched to their job by utterance text. Anything the
+    job didn't use is cancelled when it finishes; a launch that already
+    happened can't be undone and is only counted as wasted.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('SPECULATIVE_PARSE', 'true').lower() == 'true'
+        self.prelaunch = os.getenv('SPECULATIVE_PRELAUNCH', 'true').lower() == 'true'
+        # Parses and launches run on separate threads so neither waits for the other
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculation")
+
+        self.parses = 0
+        self.parse_hits = 0
+        self.launches = 0
+        self.launch_hits = 0
+        self.seconds_saved = 0.0
+
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def start(self, text, parse=True, app_name=None):
+        """Speculate for text: parse its plan and/or launch app_name; returns the Speculation or None"""
+        if not self.enabled or not (parse or app_name):
+            return None
+        # Imported lazily, as in process_command
+        from services.nagato_agent import nagato_agent
+
+        speculation = Speculation(text)
+        if parse:
+            speculation.plan_future = self.executor.submit(self._timed_parse, nagato_agent, speculation)
+        if app_name and self.prelaunch:
+            speculation.app_name = app_name
+            speculation.launch_future = self.executor.submit(nagato_agent.computer.open_application, app_name)
+
+        with self._lock:
+            self.parses += parse
+            self.launches += speculation.launch_future is not None
+            self._pending.append(speculation)
+            stale = self._pending[:-MAX_PENDING]
+            del self._pending[:-MAX_PENDING]
+        for old in stale:
+            old.cancel()
+        return speculation
+
+    @staticmethod
+    def _timed_parse(nagato_agent, speculation):
+        start = time.perf_counter()
+        steps = nagato_agent.parse_plan(speculation.text)
+        speculation.plan_seconds = time.perf_counter() - start
+        return steps
+
+    def take(self, text):
+        """Claim the oldest pending Speculation for text, or None"""
+        with self._lock:
+            for index, speculation in enumerate(self._pending):
+                if speculation.text == text:
+                    speculation.claimed = time.monotonic()
+                    return self._pending.pop(index)
+        return None
+
+    def finish(self, speculation):
+        """Record what the job used and cancel the rest"""
+        if speculation is None:
+            return
+        speculation.cancel()
+        with self._lock:
+            if speculation.plan_used:
+                self.parse_hits += 1
+                # Parse time that overlapped the status cue and the wait for the job to start
+                if speculation.plan_seconds is not None and speculation.claimed is not None:
+                    self.seconds_saved += min(speculation.plan_seconds, speculation.claimed - speculation.created)
+            if speculation.launch_used:
+                self.launch_hits += 1
+        if speculation.launch_future is not None and not speculation.launch_used and not speculation.launch_future.cancelled():
+            print(f"Speculative launch of {speculation.app_name} was not needed")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "parses": self.parses,
+                "parse_hits": self.parse_hits,
+                "launches": self.launches,
+                "launch_hits": self.launch_hits,
+                "seconds_saved": self.seconds_saved
+            }
+
+# Create singleton instance
+speculator = Speculator()
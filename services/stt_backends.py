@@ -0,0 +1,239 @@
+import os
+import gc
+import sys
+import time
+import wave
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Whisper models are trained on 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Biases recognition toward the vocabulary our commands actually use
+DEFAULT_COMMAND_PROMPT = (
+    "Open Safari. Open Chrome. Launch Spotify. Open Slack, Terminal, Finder. "
+    "Set volume to 40. Volume up. Take a screenshot. Type hello world. "
+    "Open Chrome and search for the weather."
+)
+
+def command_decode_options(language="en"):
+    """Decode options of the "command" WHISPER_DECODE_PROFILE, shared by every backend.
+
+    A few seconds of English needs no language detection, beam search or
+    temperature fallback, and there is no earlier window to condition on.
+    """
+    return {
+        "language": language or None,
+        "temperature": 0.0,
+        "beam_size": 1,
+        "condition_on_previous_text": False
+    }
+
+class SpeechBackend:
+    """Base class for speech-recognition engines used by VoiceToText.
+
+    Backends take 16 kHz float32 mono audio and return a dict with the
+    transcript under "text" and a list of {"start", "end", "text"} dicts
+    under "segments", matching the shape of openai-whisper's result.
+    """
+
+    name = None
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.model = None
+
+    def load(self):
+        """Load model weights; called once, off the UI thread"""
+        raise NotImplementedError
+
+    def transcribe(self, audio, **options):
+        """Transcribe float32 audio with whisper-style decode options"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _result(text, segments):
+        return {
+            "text": text,
+            "segments": [
+                {"start": start, "end": end, "text": segment_text}
+                for start, end, segment_text in segments
+            ]
+        }
+
+class WhisperBackend(SpeechBackend):
+    """The reference PyTorch openai-whisper implementation"""
+
+    name = "whisper"
+
+    def load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_name)
+
+    def transcribe(self, audio, **options):
+        # openai-whisper decodes greedily when no beam size is given
+        if options.get("beam_size") == 1:
+            options.pop("beam_size")
+        result = self.model.transcribe(audio, **options)
+        return self._result(
+            result["text"],
+            [(seg["start"], seg["end"], seg["text"]) for seg in result.get("segments", [])]
+        )
+
+class QuantizedWhisperBackend(WhisperBackend):
+    """openai-whisper with its Linear layers dynamically quantized to int8 on CPU"""
+
+    name = "whisper-int8"
+
+    def load(self):
+        import torch
+        import whisper
+
+        model = whisper.load_model(self.model_name, device="cpu")
+        # whisper subclasses nn.Linear only to cast dtypes, which quantize_dynamic
+        # does not recognise; on fp32 CPU the plain class behaves identically
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def transcribe(self, audio, **options):
+        # Quantized kernels are CPU-only and run in fp32
+        options["fp16"] = False
+        return super().transcribe(audio, **options)
+
+class FasterWhisperBackend(SpeechBackend):
+    """CTranslate2 faster-whisper, int8 by default"""
+
+    name = "faster-whisper"
+
+    # Decode options faster-whisper understands under the same names as openai-whisper
+    SUPPORTED_OPTIONS = {
+        "language", "task", "beam_size", "best_of", "patience", "temperature",
+        "compression_ratio_threshold", "no_speech_threshold", "condition_on_previous_text",
+        "initial_prompt", "without_timestamps", "suppress_tokens", "word_timestamps"
+    }
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(
+            self.model_name,
+            device="cpu",
+            compute_type=os.getenv('FASTER_WHISPER_COMPUTE_TYPE', 'int8'),
+            cpu_threads=int(os.getenv('FASTER_WHISPER_THREADS', 0))
+        )
+
+    def transcribe(self, audio, **options):
+        options = {key: value for key, value in options.items() if key in self.SUPPORTED_OPTIONS}
+        segments, _ = self.model.transcribe(audio, **options)
+        # Segments are produced lazily; decoding happens while we iterate
+        segments = [(seg.start, seg.end, seg.text) for seg in segments]
+        return self._result("".join(text for _, _, text in segments), segments)
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (WhisperBackend, QuantizedWhisperBackend, FasterWhisperBackend)
+}
+
+def create_backend(name=None, model_name=None):
+    """Create the backend selected by STT_BACKEND (default: whisper)"""
+    name = (name or os.getenv('STT_BACKEND', 'whisper')).lower()
+    model_name = model_name or os.getenv('WHISPER_MODEL', 'base')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STT_BACKEND '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name)
+
+def _current_memory_mb():
+    """Resident memory of this process in MB, or None if it can't be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _load_wav(path):
+    """Read a 16-bit mono WAV into Whisper's float32 format"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError("Benchmark audio must be 16-bit mono WAV")
+        sample_rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    audio = samples.astype(np.float32) / 32768.0
+    if sample_rate != WHISPER_SAMPLE_RATE:
+        target_length = int(len(audio) * WHISPER_SAMPLE_RATE / sample_rate)
+        positions = np.linspace(0, len(audio) - 1, num=target_length)
+        audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+    return audio
+
+def benchmark_backends(audio, names=None, model_name=None, runs=3, **options):
+    """Measure load time, real-time factor and memory for each backend.
+
+    RTF is mean transcription time divided by audio duration, so values
+    below 1.0 are faster than real time. Memory is the growth in resident
+    memory after loading the model. Without options every backend decodes
+    with the command profile VoiceToText uses, so their RTFs are comparable.
+    """
+    duration = len(audio) / WHISPER_SAMPLE_RATE
+    if not options:
+        options = command_decode_options(os.getenv('WHISPER_LANGUAGE', 'en'))
+        options["initial_prompt"] = os.getenv('WHISPER_INITIAL_PROMPT', DEFAULT_COMMAND_PROMPT)
+    results = []
+
+    for name in names or BACKENDS:
+        backend = create_backend(name, model_name)
+        report = {"backend": name, "model": backend.model_name}
+        try:
+            memory_before = _current_memory_mb()
+            start = time.perf_counter()
+            backend.load()
+            report["load_seconds"] = time.perf_counter() - start
+            memory_after = _current_memory_mb()
+            if memory_before is not None and memory_after is not None:
+                report["memory_mb"] = memory_after - memory_before
+
+            # The first call pays one-off setup costs, so it isn't timed
+            backend.transcribe(audio, **options)
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                text = backend.transcribe(audio, **options)["text"]
+                timings.append(time.perf_counter() - start)
+            report["rtf"] = (sum(timings) / len(timings)) / duration
+            report["text"] = text.strip()
+        except Exception as e:
+            report["error"] = str(e)
+
+        results.append(report)
+        # Release the model before measuring the next backend
+        del backend
+        gc.collect()
+
+    return results
+
+if __name__ == "__main__":
+    # Usage: python -m services.stt_backends sample.wav [backend ...]
+    if len(sys.argv) < 2:
+        print("Usage: python -m services.stt_backends <16-bit mono wav> [backend ...]")
+        print(f"Backends: {', '.join(BACKENDS)}")
+        sys.exit(1)
+
+    sample = _load_wav(sys.argv[1])
+    print(f"Benchmarking {len(sample) / WHISPER_SAMPLE_RATE:.1f}s of audio")
+    for report in benchmark_backends(sample, sys.argv[2:] or None):
+        if "error" in report:
+            print(f"{report['backend']:>15}: failed - {report['error']}")
+            continue
+        memory = f"{report['memory_mb']:.0f} MB" if "memory_mb" in report else "n/a"
+        print(
+            f"{report['backend']:>15}: RTF {report['rtf']:.3f}, "
+            f"load {report['load_seconds']:.1f}s, memory {memory} | {report['text']}"
+        )
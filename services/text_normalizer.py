@@ -0,0 +1,171 @@
+import re
+import random
+
+# Formal phrases and their contractions. Order matters where phrases overlap
+# ("it is not"): earlier entries win, as if each were substituted in turn.
+CONTRACTIONS = {
+    "I am": "I'm",
+    "I have": "I've",
+    "I will": "I'll",
+    "cannot": "can't",
+    "could not": "couldn't",
+    "did not": "didn't",
+    "does not": "doesn't",
+    "do not": "don't",
+    "had not": "hadn't",
+    "has not": "hasn't",
+    "have not": "haven't",
+    "is not": "isn't",
+    "it is": "it's",
+    "should not": "shouldn't",
+    "that is": "that's",
+    "they are": "they're",
+    "was not": "wasn't",
+    "were not": "weren't",
+    "what is": "what's",
+    "will not": "won't",
+    "would not": "wouldn't",
+    "you are": "you're",
+    "you have": "you've",
+    "you will": "you'll"
+}
+
+# Conversation starters and fillers for more natural speech
+CONVERSATION_STARTERS = ["Hmm, ", "Let's see, ", "Okay, ", "Alright, ", "Sure, ", "Got it, "]
+
+# Response variations for common actions
+RESPONSE_VARIATIONS = {
+    "opening": ["Opening", "Launching", "Starting", "Getting"],
+    "searching": ["Looking up", "Searching for", "Finding info about", "Checking"],
+    "typing": ["Typing", "Entering", "Putting in"],
+    "volume": ["Adjusting volume", "Changing the volume", "Setting volume"],
+    "screenshot": ["Taking a screenshot", "Capturing the screen", "Grabbing a snapshot"]
+}
+
+# SSML pauses after sentence and clause punctuation
+PAUSES = {
+    ".": "<break time='300ms'/>",
+    "!": "<break time='300ms'/>",
+    "?": "<break time='300ms'/>",
+    ",": "<break time='150ms'/>"
+}
+
+# Whitespace after sentence-final punctuation
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=\S)")
+
+# Words whose trailing period doesn't end a sentence
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "no."}
+
+def split_sentences(text, max_chars=200):
+    """Split text into chunks for synthesis at sentence boundaries.
+
+    The first sentence is always its own chunk so speech can start as soon
+    as it is synthesized; later sentences are merged up to max_chars so a
+    long answer doesn't turn into dozens of tiny requests.
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentence = text[start:match.start()]
+        if sentence.rsplit(None, 1)[-1].lower() in ABBREVIATIONS:
+            continue
+        sentences.append(sentence)
+        start = match.end()
+    sentences.append(text[start:])
+
+    chunks = sentences[:1]
+    for sentence in sentences[1:]:
+        if len(chunks) > 1 and len(chunks[-1]) + 1 + len(sentence) <= max_chars:
+            chunks[-1] += " " + sentence
+        else:
+            chunks.append(sentence)
+    return chunks
+
+def _contraction_pattern(contractions):
+    """One alternation regex that reproduces substituting each phrase in turn.
+
+    A single left-to-right pass differs from sequential substitution only
+    where two phrases overlap ("it is" / "is not" in "it is not"): the pass
+    takes the leftmost phrase, while sequential substitution lets whichever
+    came first in the table win. Each phrase therefore gets a negative
+    lookahead for every earlier phrase that could start inside it.
+    """
+    phrases = list(contractions)
+    alternatives = []
+    for index, phrase in enumerate(phrases):
+        words = phrase.lower().split()
+        lookaheads = []
+        for earlier in phrases[:index]:
+            earlier_words = earlier.lower().split()
+            for overlap in range(1, min(len(words), len(earlier_words))):
+                if words[-overlap:] == earlier_words[:overlap]:
+                    remainder = " ".join(earlier_words[overlap:])
+                    lookaheads.append(r"(?! " + re.escape(remainder) + r"\b)")
+        alternatives.append((len(phrase), re.escape(phrase) + "".join(lookaheads)))
+
+    # Longest first so a phrase is never cut short by one of its prefixes
+    alternatives.sort(key=lambda item: -item[0])
+    return re.compile(r"\b(?:" + "|".join(alt for _, alt in alternatives) + r")\b", re.IGNORECASE)
+
+class ConversationalNormalizer:
+    """Precompiled version of the text tweaks that make TTS output sound conversational.
+
+    Everything is compiled once at construction: contractions are a single
+    alternation regex with a lookup-table callback, pauses are one regex,
+    and the action-phrase variations keep their patterns ready to use.
+    Output (including the sequence of random draws) matches the original
+    step-by-step implementation.
+    """
+
+    def __init__(self, conversation_starters, response_variations, skip_phrases=(), contractions=CONTRACTIONS):
+        self.conversation_starters = tuple(conversation_starters)
+        self.skip_phrases = frozenset(skip_phrases)
+        self.error_prefixes = ("Error:", "Sorry, I encountered an error")
+
+        self._contractions = {formal.lower(): contraction for formal, contraction in contractions.items()}
+        self._contraction_re = _contraction_pattern(contractions)
+        self._pause_re = re.compile(r"([.!?,]) ")
+
+        self._variations = [
+            (
+                action_type,
+                variations,
+                [(phrase.lower(), re.compile(r"\b" + re.escape(phrase) + r"\b", re.IGNORECASE)) for phrase in variations]
+            )
+            for action_type, variations in response_variations.items()
+        ]
+
+    def _contract(self, match):
+        return self._contractions[match.group(0).lower()]
+
+    @staticmethod
+    def _pause(match):
+        return f"{match.group(1)} {PAUSES[match.group(1)]} "
+
+    def passthrough(self, text):
+        """True for text that is spoken exactly as given"""
+        # System messages like "Processing..." or "Listening...", and errors
+        return text in self.skip_phrases or text.startswith(self.error_prefixes)
+
+    def __call__(self, text, add_starter=True):
+        """Normalize text; add_starter=False never prepends a conversation starter"""
+        if self.passthrough(text):
+            return text
+
+        # Add random conversation starter (30% of the time when appropriate)
+        if add_starter and random.random() < 0.3 and not text.startswith(self.conversation_starters):
+            text = random.choice(self.conversation_starters) + text
+
+        text = self._contraction_re.sub(self._contract, text)
+        text = self._pause_re.sub(self._pause, text)
+
+        # Vary common action phrases
+        for action_type, variations, patterns in self._variations:
+            lowered = text.lower()
+            if action_type in lowered:
+                for phrase_lower, pattern in patterns:
+                    if phrase_lower in lowered:
+                        text = pattern.sub(random.choice(variations), text)
+                        break
+
+        return text
@@ -1,166 +1,472 @@
 import os
-import tempfile
-from openai import OpenAI
+import io
 from dotenv import load_dotenv
 import pygame
+import sounddevice as sd
+import numpy as np
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import queue
 import time
 import re
-import random
+from services.openai_client import get_client
+from services.tts_cache import SpeechCache
+from services.tts_backends import OpenAISynthesizer, create_local_synthesizer
+from services.text_normalizer import ConversationalNormalizer, CONVERSATION_STARTERS, RESPONSE_VARIATIONS, split_sentences
 
 # Load environment variables
 load_dotenv()
 
+# Status cues the UI speaks on every interaction
+STATUS_PHRASES = ["Processing...", "Listening...", "Responding..."]
+
+# The speech endpoint's raw "pcm" format: 24 kHz, 16-bit signed little-endian, mono
+PCM_SAMPLE_RATE = 24000
+
+# Phrase classes pick the speech engine: short cues can go local, long answers remote
+PHRASE_STATUS = "status"
+PHRASE_RESPONSE = "response"
+
+# Lower numbers are spoken first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+class SpeechHandle:
+    """Future-like handle for one say() call"""
+    
+    def __init__(self, text, priority, is_status=False, phrase_class=PHRASE_RESPONSE, parts=None):
+        self.text = text
+        # Sentence chunks synthesized and played in order
+        self.parts = parts or [text]
+        self.priority = priority
+        self.is_status = is_status
+        self.phrase_class = phrase_class
+        self.started = False
+        self.cancelled = False
+        self._done = threading.Event()
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """Block until the utterance has finished playing or was cancelled"""
+        return self._done.wait(timeout)
+    
+    def cancel(self):
+        """Drop the utterance if it is still queued, or cut it off if it is playing"""
+        if self._done.is_set():
+            return False
+        self.cancelled = True
+        self._done.set()
+        return True
+    
+    def _finish(self):
+        self._done.set()
+
+class _SpeechClip:
+    """One chunk of an utterance on its way from the synthesis stage to the playback stage"""
+    
+    def __init__(self, handle, index=0):
+        self.handle = handle
+        self.index = index
+        self.text = handle.parts[index]
+        self.last = index == len(handle.parts) - 1  # The handle is finished once its last clip has played
+        self.sample_rate = PCM_SAMPLE_RATE
+        self.has_audio = False  # Set once any chunk has been handed to the player
+        self.sound = None  # Set instead of chunks for phrase-bank hits
+        self.chunks = queue.Queue()  # Encoded audio as it arrives; None marks the end
+        self.created = time.perf_counter()
+
+class SpeechStream:
+    """Speaks text that arrives in pieces, such as a streamed LLM answer, one sentence at a time"""
+    
+    def __init__(self, tts, priority=PRIORITY_NORMAL):
+        self.tts = tts
+        self.priority = priority
+        self.handles = []
+        self._buffer = ""
+    
+    @property
+    def cancelled(self):
+        """True once any sentence was preempted; the rest of the answer is then dropped too"""
+        return any(handle.cancelled for handle in self.handles)
+    
+    def feed(self, delta):
+        """Add text; every sentence completed by it is queued for speech straight away"""
+        self._buffer += delta
+        # A sentence is complete once the next one has started
+        sentences = split_sentences(self._buffer, max_chars=0)
+        for sentence in sentences[:-1]:
+            self._say(sentence)
+        self._buffer = sentences[-1]
+    
+    def close(self):
+        """Speak whatever is left once the text is complete"""
+        if self._buffer.strip():
+            self._say(self._buffer)
+        self._buffer = ""
+    
+    def cancel(self):
+        for handle in self.handles:
+            handle.cancel()
+    
+    def _say(self, sentence):
+        if self.cancelled:
+            return
+        # Only the opening sentence may get a conversation starter, and repeated
+        # sentences are part of the answer rather than duplicate reports
+        handle = self.tts.say(sentence, priority=self.priority, add_starter=not self.handles, coalesce=False)
+        if handle is not None:
+            self.handles.append(handle)
+
 class TextToSpeech:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_client("tts")
         # Use a warmer, more natural voice
         self.voice = os.getenv('TTS_VOICE', 'nova')  # Changed default to nova for more natural voice
-        self.temp_dir = tempfile.gettempdir()
+        self.model = os.getenv('TTS_MODEL', 'tts-1')
+        
+        # Stream raw PCM and start playback on the first chunk instead of waiting for a full MP3
+        self.streaming = os.getenv('TTS_STREAMING', 'true').lower() == 'true'
+        self.stream_chunk_bytes = int(os.getenv('TTS_STREAM_CHUNK_BYTES', 4096))
+        self.last_time_to_first_audio = None
+        
+        # Speech engines: the remote voice plus an optional local one, chosen per phrase class.
+        # The remote call gets a short timeout so a slow network falls back to the local engine.
+        self.remote_timeout = float(os.getenv('TTS_REMOTE_TIMEOUT', 4))
+        self.remote = OpenAISynthesizer(self.client, self.model, self.voice, timeout=self.remote_timeout)
+        self.local = create_local_synthesizer()
+        self.class_backends = {
+            PHRASE_STATUS: os.getenv('TTS_STATUS_BACKEND', 'local').lower(),
+            PHRASE_RESPONSE: os.getenv('TTS_RESPONSE_BACKEND', 'remote').lower()
+        }
+        self.fallback_count = 0
+        
+        # Cache synthesized audio so repeated phrases skip the network entirely
+        self.cache = None
+        if os.getenv('TTS_CACHE_ENABLED', 'true').lower() == 'true':
+            self.cache = SpeechCache(
+                os.getenv('TTS_CACHE_DIR', os.path.join('cache', 'tts')),
+                max_bytes=int(float(os.getenv('TTS_CACHE_MAX_MB', 50)) * 1024 * 1024),
+                memory_items=int(os.getenv('TTS_CACHE_MEMORY_ITEMS', 32))
+            )
         
         # Initialize pygame mixer for audio playback
         pygame.mixer.init()
         
-        # Queue for managing multiple speech requests
-        self.speech_queue = []
+        # Fixed phrases pre-rendered in memory as pygame Sounds; see preload_phrases()
+        self.fixed_phrases = set(STATUS_PHRASES)
+        self.phrase_bank = {}
+        self.phrase_bank_hits = 0
+        self.phrase_bank_misses = 0
+        
+        # Two-stage pipeline: the synthesis thread works up to TTS_LOOKAHEAD clips
+        # ahead of the playback thread, so the next line downloads while this one plays.
+        # Both stages block on their queues, so an idle service never wakes up.
+        self.speech_queue = queue.PriorityQueue()
         self.is_speaking = False
+        self.lookahead = max(1, int(os.getenv('TTS_LOOKAHEAD', 2)))
+        
+        # Long responses are split at sentence boundaries and the chunks synthesized
+        # concurrently by a small pool, so audio starts once the first sentence is ready
+        self.sentence_chunking = os.getenv('TTS_SENTENCE_CHUNKING', 'true').lower() == 'true'
+        self.chunk_chars = int(os.getenv('TTS_CHUNK_CHARS', 200))
+        self.synth_workers = max(1, int(os.getenv('TTS_SYNTH_WORKERS', 2)))
+        self.synth_pool = ThreadPoolExecutor(max_workers=self.synth_workers, thread_name_prefix="tts-synth")
+        self.playback_queue = queue.Queue(maxsize=max(self.lookahead, self.synth_workers))
+        self._active_handles = set()
+        self._handles_lock = threading.Lock()
+        self._sequence = 0
+        
+        # Repeats of the same line within this window are spoken once
+        self.coalesce_window = float(os.getenv('TTS_COALESCE_WINDOW', 1.5))
+        self._recent = {}  # normalized text -> (handle, time requested)
+        self.coalesced_count = 0
+        self.superseded_count = 0
         self.queue_thread = threading.Thread(target=self._process_speech_queue, daemon=True)
         self.queue_thread.start()
+        self.playback_thread = threading.Thread(target=self._process_playback_queue, daemon=True)
+        self.playback_thread.start()
         
         # Conversation starters and fillers for more natural speech
-        self.conversation_starters = [
-            "Hmm, ", "Let's see, ", "Okay, ", "Alright, ", "Sure, ", "Got it, "
-        ]
+        self.conversation_starters = list(CONVERSATION_STARTERS)
         
         # Response variations for common actions
-        self.response_variations = {
-            "opening": ["Opening", "Launching", "Starting", "Getting"],
-            "searching": ["Looking up", "Searching for", "Finding info about", "Checking"],
-            "typing": ["Typing", "Entering", "Putting in"],
-            "volume": ["Adjusting volume", "Changing the volume", "Setting volume"],
-            "screenshot": ["Taking a screenshot", "Capturing the screen", "Grabbing a snapshot"]
-        }
+        self.response_variations = dict(RESPONSE_VARIATIONS)
+        
+        # Compiled once; rebuilding the patterns per call dominated short responses
+        self.normalizer = ConversationalNormalizer(
+            self.conversation_starters,
+            self.response_variations,
+            skip_phrases=STATUS_PHRASES
+        )
     
-    def say(self, text, blocking=False):
-        """Convert text to speech and play it"""
+    def say(self, text, blocking=False, priority=PRIORITY_NORMAL, preempt=False, phrase_class=None,
+            add_starter=True, coalesce=True):
+        """Convert text to speech and play it, returning a SpeechHandle.
+
+        Lower priority values are spoken first. With preempt=True, anything
+        queued or playing at a lower priority is cancelled, so a new command's
+        status cue can cut off a stale response. phrase_class (PHRASE_STATUS or
+        PHRASE_RESPONSE) selects the engine; fixed phrases default to status.
+        add_starter=False never prefixes a conversation starter, and
+        coalesce=False speaks the text even if it was just said.
+        """
         if not text:
-            return
+            return None
             
-        # Preprocess text to make it more conversational
-        conversational_text = self._make_conversational(text)
+        # Fixed phrases are spoken verbatim so they can come from the phrase bank
+        if text in self.fixed_phrases:
+            parts = [text]
+        else:
+            parts = split_sentences(text, self.chunk_chars) if self.sentence_chunking else [text]
+            # Preprocess text to make it more conversational; only the first chunk gets a starter
+            if not self.normalizer.passthrough(text):
+                parts = [self._make_conversational(part, add_starter=add_starter and index == 0) for index, part in enumerate(parts)]
+        conversational_text = " ".join(parts)
         
-        # Add speech request to queue
-        self.speech_queue.append(conversational_text)
+        if preempt:
+            self.interrupt(below=priority)
         
-        # If blocking is True, wait until speech is completed
+        is_status = text in STATUS_PHRASES
+        key = self._coalesce_key(text)
+        now = time.monotonic()
+        with self._handles_lock:
+            # Several layers report the same action; speak it once
+            recent = self._recent.get(key) if coalesce else None
+            if recent and not recent[0].cancelled and (not recent[0].done() or now - recent[1] < self.coalesce_window):
+                self.coalesced_count += 1
+                if blocking:
+                    recent[0].wait()
+                return recent[0]
+            
+            # A newer status makes any status that hasn't started yet stale
+            if is_status:
+                for stale in [h for h in self._active_handles if h.is_status and not h.started]:
+                    stale.cancel()
+                    self.superseded_count += 1
+            
+            # Add speech request to queue; the sequence number keeps equal priorities in order
+            if phrase_class is None:
+                phrase_class = PHRASE_STATUS if text in self.fixed_phrases else PHRASE_RESPONSE
+            handle = SpeechHandle(conversational_text, priority, is_status, phrase_class, parts)
+            self._active_handles.add(handle)
+            self._recent = {k: v for k, v in self._recent.items() if now - v[1] < self.coalesce_window or not v[0].done()}
+            self._recent[key] = (handle, now)
+            self._sequence += 1
+            self.speech_queue.put((priority, self._sequence, handle))
+        
+        # If blocking is True, wait until this utterance has been played
         if blocking:
-            while conversational_text in self.speech_queue or self.is_speaking:
-                time.sleep(0.1)
+            handle.wait()
+        return handle
+    
+    def speech_stream(self, priority=PRIORITY_NORMAL):
+        """A SpeechStream that starts speaking at the first complete sentence"""
+        return SpeechStream(self, priority)
+    
+    @staticmethod
+    def _coalesce_key(text):
+        """Case, punctuation and spacing don't make two lines different"""
+        return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+    
+    def coalesce_stats(self):
+        """How many say() calls were merged into an earlier one or dropped as stale status"""
+        return {"coalesced": self.coalesced_count, "superseded": self.superseded_count}
+    
+    def interrupt(self, below=PRIORITY_HIGH):
+        """Cancel every queued or playing utterance with a lower priority than below"""
+        with self._handles_lock:
+            stale = [handle for handle in self._active_handles if handle.priority > below]
+        for handle in stale:
+            handle.cancel()
+    
+    def preload_phrases(self, phrases):
+        """Pre-render fixed phrases for the configured voice on a background thread"""
+        self.fixed_phrases.update(phrases)
+        thread = threading.Thread(target=self._render_phrase_bank, args=(list(phrases),), daemon=True)
+        thread.start()
+        return thread
+    
+    def _render_phrase_bank(self, phrases):
+        for phrase in phrases:
+            if phrase in self.phrase_bank:
+                continue
+            try:
+                # WAV decodes reliably into a pygame Sound, unlike MP3 on older SDL_mixer builds
+                audio = self._render_wav(phrase, self._synthesizers_for(PHRASE_STATUS))
+                self.phrase_bank[phrase] = pygame.mixer.Sound(file=io.BytesIO(audio))
+            except Exception as e:
+                print(f"Error pre-rendering phrase '{phrase}': {str(e)}")
+        print(f"Phrase bank ready: {len(self.phrase_bank)} phrases")
+    
+    def phrase_bank_stats(self):
+        """How often fixed phrases were played from the bank vs. synthesized on demand"""
+        return {
+            "hits": self.phrase_bank_hits,
+            "misses": self.phrase_bank_misses,
+            "loaded": len(self.phrase_bank),
+            "phrases": len(self.fixed_phrases)
+        }
     
     def _process_speech_queue(self):
-        """Process the speech queue in a separate thread"""
+        """Synthesis stage: turn queued text into clips and hand them to the synthesis pool"""
+        while True:
+            _, _, handle = self.speech_queue.get()
+            for index in range(len(handle.parts)):
+                if handle.cancelled:
+                    self._release(handle)
+                    break
+                clip = _SpeechClip(handle, index)
+                # Blocks while the playback stage is already a full queue of clips behind,
+                # which also bounds how many chunks are synthesized at once
+                self.playback_queue.put(clip)
+                self.synth_pool.submit(self._synthesize_clip, clip)
+    
+    def _process_playback_queue(self):
+        """Playback stage: play clips in order, streaming each as its audio arrives"""
         while True:
-            if self.speech_queue and not self.is_speaking:
-                text = self.speech_queue.pop(0)
-                self.is_speaking = True
-                self._generate_and_play_speech(text)
+            clip = self.playback_queue.get()
+            if clip.handle.cancelled:
+                self._release(clip.handle)
+                continue
+            self.is_speaking = True
+            clip.handle.started = True
+            try:
+                self._play_clip(clip)
+            except Exception as e:
+                print(f"Error playing speech: {str(e)}")
+            finally:
                 self.is_speaking = False
-            time.sleep(0.1)
+                if clip.last or clip.handle.cancelled:
+                    self._release(clip.handle)
+    
+    def _release(self, handle):
+        handle._finish()
+        with self._handles_lock:
+            self._active_handles.discard(handle)
     
-    def _make_conversational(self, text):
+    def _make_conversational(self, text, add_starter=True):
         """Make the text more conversational by adding markers, variations and pauses"""
-        # Skip preprocessing for system messages like "Processing..." or "Listening..."
-        if text in ["Processing...", "Listening...", "Responding..."]:
-            return text
-            
-        # Don't add conversation starters to error messages
-        if text.startswith("Error:") or text.startswith("Sorry, I encountered an error"):
-            return text
-            
-        # Add random conversation starter (30% of the time when appropriate)
-        if random.random() < 0.3 and not any(text.startswith(starter) for starter in self.conversation_starters):
-            text = random.choice(self.conversation_starters) + text
-            
-        # Replace formal phrases with contractions
-        contractions = {
-            "I am": "I'm",
-            "I have": "I've",
-            "I will": "I'll",
-            "cannot": "can't",
-            "could not": "couldn't",
-            "did not": "didn't",
-            "does not": "doesn't",
-            "do not": "don't",
-            "had not": "hadn't",
-            "has not": "hasn't",
-            "have not": "haven't",
-            "is not": "isn't",
-            "it is": "it's",
-            "should not": "shouldn't",
-            "that is": "that's",
-            "they are": "they're",
-            "was not": "wasn't",
-            "were not": "weren't",
-            "what is": "what's",
-            "will not": "won't",
-            "would not": "wouldn't",
-            "you are": "you're",
-            "you have": "you've",
-            "you will": "you'll"
-        }
-        
-        for formal, contraction in contractions.items():
-            # Use word boundaries to avoid partial word matches
-            text = re.sub(r'\b' + formal + r'\b', contraction, text, flags=re.IGNORECASE)
-            
-        # Add SSML pauses for more natural speech rhythm
-        # Note: OpenAI TTS supports basic SSML tags
-        text = text.replace(". ", ". <break time='300ms'/> ")
-        text = text.replace("! ", "! <break time='300ms'/> ")
-        text = text.replace("? ", "? <break time='300ms'/> ")
-        text = text.replace(", ", ", <break time='150ms'/> ")
-        
-        # Vary common action phrases
-        for action_type, variations in self.response_variations.items():
-            if action_type in text.lower():
-                for phrase in variations:
-                    if phrase.lower() in text.lower():
-                        replacement = random.choice(variations)
-                        text = re.sub(r'\b' + phrase + r'\b', replacement, text, flags=re.IGNORECASE)
-                        break
-                        
-        return text
-    
-    def _generate_and_play_speech(self, text):
-        """Generate speech using OpenAI API and play it"""
+        return self.normalizer(text, add_starter)
+    
+    def _synthesize_clip(self, clip):
+        """Fill a clip from the phrase bank, the cache or the speech endpoint"""
         try:
-            # Generate a unique filename
-            speech_file_path = os.path.join(self.temp_dir, f"speech_{int(time.time())}.mp3")
-            
-            # Create and save the speech file
-            response = self.client.audio.speech.create(
-                model="tts-1",
-                voice=self.voice,
-                input=text
-            )
-            response.stream_to_file(speech_file_path)
+            if clip.handle.cancelled:
+                return
+            sound = self.phrase_bank.get(clip.text)
+            if sound is not None:
+                self.phrase_bank_hits += 1
+                clip.sound = sound
+                return
+            if clip.text in self.fixed_phrases:
+                # Asked for before the bank finished rendering it
+                self.phrase_bank_misses += 1
             
-            # Play the audio
-            pygame.mixer.music.load(speech_file_path)
-            pygame.mixer.music.play()
+            synthesizers = self._synthesizers_for(clip.handle.phrase_class)
+            if not self.streaming:
+                # Decoded here, ahead of playback, so the player just starts it
+                clip.sound = pygame.mixer.Sound(file=io.BytesIO(self._render_wav(clip.text, synthesizers)))
+                return
             
-            # Wait for the audio to finish playing
-            while pygame.mixer.music.get_busy():
-                time.sleep(0.1)
-                
-            # Clean up the temporary file
-            try:
-                os.remove(speech_file_path)
-            except:
-                pass
+            for index, synthesizer in enumerate(synthesizers):
+                try:
+                    self._stream_into_clip(clip, synthesizer)
+                    return
+                except Exception as e:
+                    # Once audio has reached the player, switching voices would repeat words
+                    if clip.has_audio or index == len(synthesizers) - 1:
+                        raise
+                    self.fallback_count += 1
+                    print(f"{synthesizer.name} speech failed ({str(e)}), falling back to {synthesizers[index + 1].name}")
                 
         except Exception as e:
-            print(f"Error generating or playing speech: {str(e)}")
+            print(f"Error generating speech: {str(e)}")
+        finally:
+            clip.chunks.put(None)
+    
+    def _synthesizers_for(self, phrase_class):
+        """Engines to try for a phrase class, preferred first"""
+        if self.local is None:
+            return [self.remote]
+        if self.class_backends.get(phrase_class) == 'local':
+            return [self.local]
+        return [self.remote, self.local]
+    
+    def _stream_into_clip(self, clip, synthesizer):
+        """Stream PCM from one engine (or the cache) into the clip's chunk queue"""
+        clip.sample_rate = synthesizer.sample_rate
+        key = SpeechCache.make_key(synthesizer.cache_id, "pcm", clip.text) if self.cache else None
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            clip.has_audio = True
+            clip.chunks.put(cached)
+            return
+        
+        received = []
+        for chunk in synthesizer.stream_pcm(clip.text, self.stream_chunk_bytes):
+            if clip.handle.cancelled:
+                # Preempted mid-synthesis; don't cache a partial clip
+                return
+            received.append(chunk)
+            clip.has_audio = True
+            clip.chunks.put(chunk)
+        if key and received:
+            self.cache.put(key, b"".join(received))
+    
+    def _render_wav(self, text, synthesizers):
+        """Return WAV bytes for text, from the cache when possible, falling back between engines"""
+        for index, synthesizer in enumerate(synthesizers):
+            key = SpeechCache.make_key(synthesizer.cache_id, "wav", text) if self.cache else None
+            if key:
+                audio = self.cache.get(key)
+                if audio is not None:
+                    return audio
+            try:
+                audio = synthesizer.synthesize_wav(text)
+            except Exception as e:
+                if index == len(synthesizers) - 1:
+                    raise
+                self.fallback_count += 1
+                print(f"{synthesizer.name} speech failed ({str(e)}), falling back to {synthesizers[index + 1].name}")
+                continue
+            if key:
+                self.cache.put(key, audio)
+            return audio
+    
+    def _play_clip(self, clip):
+        # Wait for the first chunk; for Sound clips this is the end marker
+        chunk = clip.chunks.get()
+        
+        if clip.sound is not None:
+            channel = clip.sound.play()
+            # The handle's event doubles as the interrupt: it is only set early by cancel()
+            if clip.handle.wait(clip.sound.get_length()) and channel is not None:
+                channel.stop()
+            return
+        if chunk is None:
+            return
+        
+        if clip.index == 0:
+            self.last_time_to_first_audio = time.perf_counter() - clip.created
+        
+        leftover = b""
+        with sd.RawOutputStream(samplerate=clip.sample_rate, channels=1, dtype=np.int16) as stream:
+            while chunk is not None and not clip.handle.cancelled:
+                # Network chunks can split a sample; hold back the odd byte
+                data = leftover + chunk
+                usable = len(data) - len(data) % 2
+                leftover = data[usable:]
+                if usable:
+                    stream.write(data[:usable])
+                chunk = clip.chunks.get()
+            # Also cancelled while waiting for a chunk: the synthesis stage then
+            # ends the clip early, and the buffered audio is cut off, not drained
+            if clip.handle.cancelled:
+                stream.abort()
+        # Leaving the with-block drains the remaining buffered audio
 
 # Create a singleton instance
 tts_service = TextToSpeech() 
\ No newline at end of file
@@ -0,0 +1,195 @@
+import io
+import os
+import re
+import json
+import wave
+import shutil
+import subprocess
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# SSML tags such as the <break time='300ms'/> pauses added by the text normalizer
+_SSML_TAG = re.compile(r"<[^<>]*>")
+
+def strip_ssml(text):
+    """Plain text for engines that would read markup aloud; the pauses already follow punctuation"""
+    return " ".join(_SSML_TAG.sub(" ", text).split())
+
+class SpeechSynthesizer:
+    """Base class for text-to-speech engines used by TextToSpeech.
+
+    Engines produce 16-bit signed little-endian mono PCM at sample_rate,
+    either streamed in chunks or wrapped as a complete WAV file.
+    """
+
+    name = None
+    sample_rate = 24000
+
+    def __init__(self, voice):
+        self.voice = voice
+
+    @property
+    def cache_id(self):
+        """Identifies the engine, model and voice in speech cache keys"""
+        return f"{self.name}:{self.voice}"
+
+    def stream_pcm(self, text, chunk_bytes=4096):
+        """Yield PCM chunks as they are produced"""
+        raise NotImplementedError
+
+    def synthesize_wav(self, text):
+        """Return the whole utterance as WAV bytes"""
+        return self.pcm_to_wav(b"".join(self.stream_pcm(text)))
+
+    def pcm_to_wav(self, pcm):
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(pcm)
+        return buffer.getvalue()
+
+class OpenAISynthesizer(SpeechSynthesizer):
+    """OpenAI's speech endpoint; its raw "pcm" format is 24 kHz"""
+
+    name = "openai"
+    sample_rate = 24000
+
+    def __init__(self, client, model, voice, timeout=None):
+        super().__init__(voice)
+        self.model = model
+        # A short timeout lets callers fall back to a local engine instead of waiting
+        self.client = client.with_options(timeout=timeout) if timeout else client
+
+    @property
+    def cache_id(self):
+        return f"{self.name}:{self.model}:{self.voice}"
+
+    def stream_pcm(self, text, chunk_bytes=4096):
+        with self.client.audio.speech.with_streaming_response.create(
+            model=self.model,
+            voice=self.voice,
+            input=text,
+            response_format="pcm"
+        ) as response:
+            for chunk in response.iter_bytes(chunk_bytes):
+                yield chunk
+
+    def synthesize_wav(self, text):
+        response = self.client.audio.speech.create(
+            model=self.model,
+            voice=self.voice,
+            input=text,
+            response_format="wav"
+        )
+        return response.content
+
+class _SubprocessSynthesizer(SpeechSynthesizer):
+    """Runs a command-line engine and streams PCM from its stdout"""
+
+    executable = None
+    # Bytes of container header to strip from stdout before the PCM starts
+    header_bytes = 0
+
+    @classmethod
+    def available(cls):
+        return shutil.which(cls.executable) is not None
+
+    def _command(self, text):
+        raise NotImplementedError
+
+    def _stdin(self, text):
+        return None
+
+    def stream_pcm(self, text, chunk_bytes=4096):
+        # Neither espeak-ng (without -m) nor Piper understands SSML
+        text = strip_ssml(text)
+        stdin = self._stdin(text)
+        process = subprocess.Popen(
+            self._command(text),
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            if stdin is not None:
+                process.stdin.write(stdin.encode("utf-8"))
+                process.stdin.close()
+            if self.header_bytes:
+                process.stdout.read(self.header_bytes)
+            while True:
+                chunk = process.stdout.read1(chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            # Also runs when the consumer stops early, e.g. on preemption
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+class EspeakSynthesizer(_SubprocessSynthesizer):
+    """espeak-ng: robotic but tiny, and starts speaking in a few milliseconds"""
+
+    name = "espeak"
+    executable = "espeak-ng"
+    sample_rate = 22050
+    # espeak-ng --stdout writes a canonical 44-byte WAV header before the samples
+    header_bytes = 44
+
+    def __init__(self, voice=None):
+        super().__init__(voice or os.getenv('ESPEAK_VOICE', 'en-us'))
+        self.words_per_minute = int(os.getenv('ESPEAK_WPM', 175))
+
+    def _command(self, text):
+        return [self.executable, "--stdout", "-v", self.voice, "-s", str(self.words_per_minute), text]
+
+class PiperSynthesizer(_SubprocessSynthesizer):
+    """Piper neural voices (ONNX), much closer to the remote voice quality"""
+
+    name = "piper"
+    executable = "piper"
+
+    def __init__(self, voice=None):
+        super().__init__(voice or os.getenv('PIPER_MODEL', ''))
+        # Each voice model ships a JSON config with its output sample rate
+        try:
+            with open(f"{self.voice}.json") as f:
+                self.sample_rate = json.load(f)["audio"]["sample_rate"]
+        except (OSError, KeyError, ValueError):
+            self.sample_rate = 22050
+
+    @classmethod
+    def available(cls):
+        return super().available() and os.path.isfile(os.getenv('PIPER_MODEL', ''))
+
+    def _command(self, text):
+        return [self.executable, "--model", self.voice, "--output-raw"]
+
+    def _stdin(self, text):
+        return text + "\n"
+
+LOCAL_SYNTHESIZERS = {
+    synthesizer.name: synthesizer
+    for synthesizer in (PiperSynthesizer, EspeakSynthesizer)
+}
+
+def create_local_synthesizer(name=None):
+    """The local engine selected by TTS_LOCAL_ENGINE, or the best installed one for 'auto'"""
+    name = (name or os.getenv('TTS_LOCAL_ENGINE', 'auto')).lower()
+    if name == 'none':
+        return None
+    if name == 'auto':
+        for synthesizer in LOCAL_SYNTHESIZERS.values():
+            if synthesizer.available():
+                return synthesizer()
+        return None
+    if name not in LOCAL_SYNTHESIZERS:
+        raise ValueError(f"Unknown TTS_LOCAL_ENGINE '{name}', expected auto, none or one of: {', '.join(LOCAL_SYNTHESIZERS)}")
+    if not LOCAL_SYNTHESIZERS[name].available():
+        print(f"Local TTS engine '{name}' is not installed")
+        return None
+    return LOCAL_SYNTHESIZERS[name]()
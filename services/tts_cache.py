@@ -0,0 +1,139 @@
+import os
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+class SpeechCache:
+    """Content-addressed cache of synthesized speech.
+
+    A small in-memory LRU sits in front of a directory of audio files. The
+    directory is bounded by total size and evicts least recently used files
+    first (tracked by modification time, which is bumped on every hit).
+    """
+
+    FILE_SUFFIX = ".audio"
+
+    def __init__(self, cache_dir, max_bytes, memory_items=32):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._disk = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    @staticmethod
+    def normalize_text(text):
+        """Collapse whitespace and Unicode variants that don't change what is spoken"""
+        return " ".join(unicodedata.normalize("NFC", text).split())
+
+    @classmethod
+    def make_key(cls, *parts):
+        """Hash the synthesis parameters (model, voice, ...) and the text, which comes last"""
+        *params, text = parts
+        material = "\x1f".join([*map(str, params), cls.normalize_text(text)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def _scan_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.FILE_SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-len(self.FILE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def get(self, key):
+        """Return cached audio bytes, or None on a miss"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._touch(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if key not in self._disk:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                # Deleted behind our back; forget it
+                self._disk_bytes -= self._disk.pop(key)
+                self.misses += 1
+                return None
+
+            self._touch(key)
+            self._remember(key, data)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        """Store audio bytes under key, evicting old entries to stay under max_bytes"""
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+            if key in self._disk:
+                return
+
+            path = self._path(key)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                # Atomic rename so a crash never leaves a truncated entry
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Error writing speech cache entry: {str(e)}")
+                return
+
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._evict()
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key):
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
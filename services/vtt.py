@@ -1,11 +1,13 @@
-import whisper
 import sounddevice as sd
 import numpy as np
-import torch
 import wave
 import os
 import ssl
+import queue
+import threading
+from concurrent.futures import Future
 from dotenv import load_dotenv
+from services.stt_backends import create_backend, command_decode_options, WHISPER_SAMPLE_RATE, DEFAULT_COMMAND_PROMPT
 
 # Load environment variables
 load_dotenv()
@@ -18,68 +20,267 @@ class VoiceToText:
         try:
             # Get configuration from environment
             self.WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'base')
+            self.STT_BACKEND = os.getenv('STT_BACKEND', 'whisper')
             self.SAMPLE_RATE = int(os.getenv('SAMPLE_RATE', 16000))
             self.DURATION = int(os.getenv('RECORDING_DURATION', 5))
             
-            print(f"Loading Whisper model: {self.WHISPER_MODEL}")
-            self.model = whisper.load_model(self.WHISPER_MODEL)
-            print("Model loaded successfully")
+            # Voice-activity endpointing for streaming capture
+            self.VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true'
+            self.VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', 30))
+            self.VAD_ENERGY_THRESHOLD = float(os.getenv('VAD_ENERGY_THRESHOLD', 500))
+            self.VAD_ZCR_THRESHOLD = float(os.getenv('VAD_ZCR_THRESHOLD', 0.25))
+            self.VAD_SILENCE_DURATION = float(os.getenv('VAD_SILENCE_DURATION', 0.8))
+            self.MIN_UTTERANCE_DURATION = float(os.getenv('MIN_UTTERANCE_DURATION', 0.5))
+            self.MAX_UTTERANCE_DURATION = float(os.getenv('MAX_UTTERANCE_DURATION', 10))
+            
+            # Rolling partial transcription while the user is still speaking
+            self.PARTIAL_TRANSCRIPTION = os.getenv('PARTIAL_TRANSCRIPTION', 'true').lower() == 'true'
+            self.PARTIAL_INTERVAL = int(os.getenv('PARTIAL_INTERVAL_MS', 500)) / 1000
+            
+            # Decode profile: "command" is tuned for short commands, "default" uses Whisper's defaults
+            self.DECODE_PROFILE = os.getenv('WHISPER_DECODE_PROFILE', 'command').lower()
+            self.WHISPER_LANGUAGE = os.getenv('WHISPER_LANGUAGE', 'en')
+            self.WHISPER_INITIAL_PROMPT = os.getenv('WHISPER_INITIAL_PROMPT', DEFAULT_COMMAND_PROMPT)
+            self.decode_options = self._build_decode_options()
             
+            # The model loads on a background thread; see preload()
+            self.WHISPER_WARMUP = os.getenv('WHISPER_WARMUP', 'true').lower() == 'true'
+            self._backend = create_backend(self.STT_BACKEND, self.WHISPER_MODEL)
+            self._model_future = Future()
+            self._loader_thread = None
+            self._loader_lock = threading.Lock()
+            # Partial and final decodes share the model, one at a time
+            self._model_lock = threading.Lock()
+            
+            # Audio goes to Whisper in memory; the WAV dump is only for debugging
+            self.SAVE_DEBUG_AUDIO = os.getenv('SAVE_DEBUG_AUDIO', 'false').lower() == 'true'
             self.FILENAME = "temp/voice_command.wav"
-            os.makedirs("temp", exist_ok=True)
+            if self.SAVE_DEBUG_AUDIO:
+                os.makedirs("temp", exist_ok=True)
             
         except Exception as e:
             print(f"Error initializing VoiceToText: {str(e)}")
             raise
 
-    def record_audio(self):
-        """Record audio from microphone"""
+    def _build_decode_options(self):
+        """Decode options for the configured WHISPER_DECODE_PROFILE"""
+        if self.DECODE_PROFILE == 'default':
+            return {}
+        if self.DECODE_PROFILE != 'command':
+            raise ValueError(f"Unknown WHISPER_DECODE_PROFILE '{self.DECODE_PROFILE}', expected 'command' or 'default'")
+        return command_decode_options(self.WHISPER_LANGUAGE)
+
+    def _prompt(self, context=None):
+        """Combine the vocabulary prompt with already-recognized text"""
+        parts = [context]
+        if self.DECODE_PROFILE == 'command':
+            parts.insert(0, self.WHISPER_INITIAL_PROMPT)
+        return " ".join(part.strip() for part in parts if part and part.strip()) or None
+
+    def preload(self):
+        """Start loading the speech model in the background (idempotent)"""
+        with self._loader_lock:
+            if self._loader_thread is None:
+                self._loader_thread = threading.Thread(target=self._load_model, daemon=True)
+                self._loader_thread.start()
+        return self._model_future
+
+    def _load_model(self):
+        try:
+            print(f"Loading {self.STT_BACKEND} model: {self.WHISPER_MODEL}")
+            # Backends import their frameworks here, so torch loads off the UI thread too
+            self._backend.load()
+            print("Model loaded successfully")
+
+            if self.WHISPER_WARMUP:
+                # One pass over silence primes kernels, caches and the mel filterbank
+                self._backend.transcribe(
+                    np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32),
+                    initial_prompt=self._prompt(),
+                    **self.decode_options
+                )
+                print("Model warm-up complete")
+
+            self._model_future.set_result(self._backend)
+        except Exception as e:
+            print(f"Error loading speech model: {str(e)}")
+            self._model_future.set_exception(e)
+
+    @property
+    def backend(self):
+        """The loaded speech backend, waiting for the background load if needed"""
+        future = self.preload()
+        if not future.done():
+            print("Waiting for speech model to finish loading...")
+        return future.result()
+
+    def record_audio(self, live_buffer=None, preroll=None):
+        """Record audio from microphone, mirroring frames into live_buffer if given.
+
+        preroll is int16 audio captured before recording started (e.g. by the
+        wake word listener) and is treated as the start of the recording.
+        """
         try:
             print("Listening for command...")
-            recording = sd.rec(
-                int(self.DURATION * self.SAMPLE_RATE),
-                samplerate=self.SAMPLE_RATE,
-                channels=1,
-                dtype=np.int16
-            )
-            sd.wait()  # Wait until recording is finished
+            if self.VAD_ENABLED:
+                recording = self._record_streaming(live_buffer, preroll)
+            else:
+                recording = self._record_fixed()
+                if preroll is not None and len(preroll):
+                    recording = np.concatenate((preroll, recording))
+
+            if self.SAVE_DEBUG_AUDIO:
+                self._save_debug_audio(recording)
 
-            # Save as WAV file
+            return recording
+            
+        except Exception as e:
+            print(f"Error recording audio: {str(e)}")
+            raise
+
+    def _save_debug_audio(self, recording):
+        """Dump the recording to a WAV file for inspection"""
+        try:
             with wave.open(self.FILENAME, 'wb') as wf:
                 wf.setnchannels(1)
                 wf.setsampwidth(2)
                 wf.setframerate(self.SAMPLE_RATE)
                 wf.writeframes(recording.tobytes())
-
-            print("Recording saved.")
-            
+            print(f"Recording saved to {self.FILENAME}")
         except Exception as e:
-            print(f"Error recording audio: {str(e)}")
-            raise
+            print(f"Error saving debug audio: {str(e)}")
+
+    def _to_whisper_input(self, recording):
+        """Convert int16 samples to the 16 kHz float32 array Whisper expects"""
+        audio = recording.astype(np.float32) / 32768.0
+        if self.SAMPLE_RATE != WHISPER_SAMPLE_RATE and len(audio):
+            # Linear resampling is plenty for speech recognition input
+            target_length = int(len(audio) * WHISPER_SAMPLE_RATE / self.SAMPLE_RATE)
+            source_positions = np.linspace(0, len(audio) - 1, num=target_length)
+            audio = np.interp(source_positions, np.arange(len(audio)), audio).astype(np.float32)
+        return audio
+
+    def _record_fixed(self):
+        """Record for the full RECORDING_DURATION"""
+        recording = sd.rec(
+            int(self.DURATION * self.SAMPLE_RATE),
+            samplerate=self.SAMPLE_RATE,
+            channels=1,
+            dtype=np.int16
+        )
+        sd.wait()  # Wait until recording is finished
+        return recording[:, 0]
+
+    def _record_streaming(self, live_buffer=None, preroll=None):
+        """Record from an input stream until trailing silence ends the utterance"""
+        frame_size = int(self.SAMPLE_RATE * self.VAD_FRAME_MS / 1000)
+        silence_limit = int(self.VAD_SILENCE_DURATION * self.SAMPLE_RATE)
+        min_samples = int(self.MIN_UTTERANCE_DURATION * self.SAMPLE_RATE)
+        max_samples = int(self.MAX_UTTERANCE_DURATION * self.SAMPLE_RATE)
+        frame_queue = queue.Queue()
+
+        def callback(indata, frames, time_info, status):
+            if status:
+                print(f"Audio input status: {status}")
+            # Copy out of the driver buffer, which is reused between callbacks
+            frame_queue.put(indata[:, 0].copy())
+
+        # Pre-roll goes through the same endpointing as live frames
+        pending = []
+        if preroll is not None:
+            pending = [preroll[i:i + frame_size] for i in range(0, len(preroll), frame_size)]
+
+        frames = []
+        total_samples = 0
+        speech_samples = 0
+        silence_samples = 0
+        speech_started = False
 
-    def transcribe_audio(self):
-        """Transcribe audio using Whisper"""
+        with sd.InputStream(
+            samplerate=self.SAMPLE_RATE,
+            channels=1,
+            dtype=np.int16,
+            blocksize=frame_size,
+            callback=callback
+        ):
+            while total_samples < max_samples:
+                if pending:
+                    frame = pending.pop(0)
+                else:
+                    try:
+                        frame = frame_queue.get(timeout=1.0)
+                    except queue.Empty:
+                        raise RuntimeError("No audio received from the microphone")
+
+                frames.append(frame)
+                total_samples += len(frame)
+                if live_buffer is not None:
+                    live_buffer.append(frame)
+                is_speech = self._is_speech(frame)
+
+                if not speech_started:
+                    if is_speech:
+                        speech_started = True
+                        speech_samples = len(frame)
+                    continue
+
+                speech_samples += len(frame)
+                silence_samples = 0 if is_speech else silence_samples + len(frame)
+
+                # Stop as soon as the speaker has been quiet long enough
+                if silence_samples >= silence_limit and speech_samples >= min_samples:
+                    break
+
+        print(f"Captured {total_samples / self.SAMPLE_RATE:.2f}s of audio")
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.int16)
+
+    def _is_speech(self, frame):
+        """Classify a frame as speech using short-time energy and zero-crossing rate"""
+        if len(frame) == 0:
+            return False
+        samples = frame.astype(np.float32)
+        energy = np.sqrt(np.mean(samples ** 2))
+        zero_crossings = np.count_nonzero(np.diff(np.signbit(samples))) / len(samples)
+
+        # Voiced speech is loud; unvoiced consonants are quieter but crossing-heavy
+        if energy >= self.VAD_ENERGY_THRESHOLD:
+            return True
+        return energy >= self.VAD_ENERGY_THRESHOLD * 0.5 and zero_crossings >= self.VAD_ZCR_THRESHOLD
+
+    def transcribe_audio(self, recording, initial_prompt=None):
+        """Transcribe recorded int16 audio using Whisper"""
         try:
             print("Transcribing...")
-            result = self.model.transcribe(self.FILENAME)
-            
-            # Clean up the temporary file
-            try:
-                os.remove(self.FILENAME)
-            except:
-                pass
-                
-            return result["text"]
+            return self._transcribe(recording, initial_prompt)["text"]
             
         except Exception as e:
             print(f"Error transcribing audio: {str(e)}")
             raise
 
-    def get_voice_command(self):
-        """Main function to get voice command"""
+    def _transcribe(self, recording, initial_prompt=None):
+        """Run the speech backend over int16 audio and return the full result dict"""
+        with self._model_lock:
+            return self.backend.transcribe(
+                self._to_whisper_input(recording),
+                initial_prompt=self._prompt(initial_prompt),
+                **self.decode_options
+            )
+
+    def get_voice_command(self, on_partial=None, preroll=None):
+        """Main function to get voice command, reporting partial text to on_partial"""
         try:
-            self.record_audio()
-            command = self.transcribe_audio()
+            if self.VAD_ENABLED and self.PARTIAL_TRANSCRIPTION:
+                live_buffer = LiveAudioBuffer()
+                transcriber = RollingTranscriber(self, live_buffer, on_partial, self.PARTIAL_INTERVAL)
+                transcriber.start()
+                try:
+                    recording = self.record_audio(live_buffer, preroll)
+                finally:
+                    transcriber.stop()
+                command = transcriber.finalize(recording)
+            else:
+                recording = self.record_audio(preroll=preroll)
+                command = self.transcribe_audio(recording)
             print(f"Recognized Command: {command}")
             return command.lower()
             
@@ -87,6 +288,109 @@ class VoiceToText:
             print(f"Error getting voice command: {str(e)}")
             return "Sorry, I couldn't understand that."
 
+class LiveAudioBuffer:
+    """Thread-safe growing buffer of int16 frames shared with the partial transcriber"""
+
+    def __init__(self):
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def append(self, frame):
+        with self._lock:
+            self._frames.append(frame)
+
+    def snapshot(self):
+        with self._lock:
+            frames = list(self._frames)
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.int16)
+
+class RollingTranscriber:
+    """Re-decodes a growing recording on a worker thread and emits partial hypotheses.
+
+    Segments that come out identical on two consecutive passes and end well
+    before the live edge are committed: their text is kept and their audio is
+    dropped from later passes, so the final decode only covers the unstable tail.
+    """
+
+    # Audio this close to the live edge may still change, so it is never committed
+    STABILITY_MARGIN = 1.0
+    # Skip decoding until there is at least this much uncommitted audio
+    MIN_DECODE_DURATION = 0.5
+
+    def __init__(self, vtt, live_buffer, on_partial=None, interval=0.5):
+        self.vtt = vtt
+        self.live_buffer = live_buffer
+        self.on_partial = on_partial
+        self.interval = interval
+        self.committed_text = ""
+        self.committed_samples = 0
+        self._previous_segments = []
+        self._last_partial = ""
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker, waiting for any in-flight partial decode"""
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self._decode_partial()
+            except Exception as e:
+                print(f"Error in partial transcription: {str(e)}")
+
+    def _decode_partial(self):
+        sample_rate = self.vtt.SAMPLE_RATE
+        tail = self.live_buffer.snapshot()[self.committed_samples:]
+        if len(tail) < self.MIN_DECODE_DURATION * sample_rate:
+            return
+
+        segments = self.vtt._transcribe(tail, self.committed_text).get("segments", [])
+        tail_duration = len(tail) / sample_rate
+
+        # Commit the leading run of segments that agree with the previous pass
+        stable_count = 0
+        for current, previous in zip(segments, self._previous_segments):
+            if current["text"].strip() != previous["text"].strip():
+                break
+            if current["end"] > tail_duration - self.STABILITY_MARGIN:
+                break
+            stable_count += 1
+
+        if stable_count:
+            stable = segments[:stable_count]
+            self.committed_text = self._join(self.committed_text, *(seg["text"] for seg in stable))
+            self.committed_samples += int(stable[-1]["end"] * sample_rate)
+            segments = segments[stable_count:]
+            # Offsets are relative to the old tail, so start agreement afresh
+            self._previous_segments = []
+        else:
+            self._previous_segments = segments
+
+        hypothesis = self._join(self.committed_text, *(seg["text"] for seg in segments))
+        if self.on_partial and hypothesis and hypothesis != self._last_partial:
+            self._last_partial = hypothesis
+            self.on_partial(hypothesis)
+
+    def finalize(self, recording):
+        """Decode whatever was not committed and return the full transcript"""
+        tail = recording[self.committed_samples:]
+        if len(tail) < self.MIN_DECODE_DURATION * self.vtt.SAMPLE_RATE and self.committed_text:
+            return self.committed_text
+        print("Transcribing...")
+        tail_text = self.vtt._transcribe(tail, self.committed_text)["text"]
+        return self._join(self.committed_text, tail_text)
+
+    @staticmethod
+    def _join(*parts):
+        return " ".join(part.strip() for part in parts if part and part.strip())
+
 # Initialize service with better error handling
 try:
     vtt_service = VoiceToText()
@@ -94,7 +398,10 @@ except Exception as e:
     print(f"Failed to initialize VoiceToText service: {str(e)}")
     # Create a mock service that returns a fixed response for testing
     class MockVoiceToText:
-        def get_voice_command(self):
+        def preload(self):
+            pass
+
+        def get_voice_command(self, on_partial=None, preroll=None):
             return "This is a mock response since VoiceToText failed to initialize."
     vtt_service = MockVoiceToText()
     print("Using MockVoiceToText service instead.")
@@ -0,0 +1,315 @@
+import os
+import sys
+import glob
+import threading
+import numpy as np
+import sounddevice as sd
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix"""
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+
+    filters = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+def _dct_matrix(n_mfcc, n_mels):
+    """Orthonormal DCT-II basis, so MFCCs are a single matrix multiply"""
+    n = np.arange(n_mels)
+    basis = np.cos(np.pi / n_mels * (n + 0.5)[None, :] * np.arange(n_mfcc)[:, None])
+    basis[0] *= 1 / np.sqrt(2)
+    return basis * np.sqrt(2 / n_mels)
+
+class MFCCExtractor:
+    """Minimal NumPy MFCC front end for keyword spotting"""
+
+    def __init__(self, sample_rate, n_mfcc=13, n_mels=26, frame_ms=25, hop_ms=20):
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.hop_length = int(sample_rate * hop_ms / 1000)
+        self.n_fft = 1 << (self.frame_length - 1).bit_length()
+        self.window = np.hamming(self.frame_length)
+        self.filters = _mel_filterbank(sample_rate, self.n_fft, n_mels)
+        self.dct = _dct_matrix(n_mfcc, n_mels)
+
+    def __call__(self, audio):
+        """MFCCs of int16 or float audio as a (frames, n_mfcc) array"""
+        audio = np.asarray(audio, dtype=np.float32)
+        if len(audio) < self.frame_length:
+            return np.zeros((0, self.dct.shape[0]))
+
+        # Pre-emphasis, then overlapping windowed frames via strides
+        audio = np.append(audio[0], audio[1:] - 0.97 * audio[:-1])
+        n_frames = 1 + (len(audio) - self.frame_length) // self.hop_length
+        frames = np.lib.stride_tricks.as_strided(
+            audio,
+            shape=(n_frames, self.frame_length),
+            strides=(audio.strides[0] * self.hop_length, audio.strides[0])
+        ) * self.window
+
+        power = np.abs(np.fft.rfft(frames, self.n_fft)) ** 2 / self.n_fft
+        log_mel = np.log(power @ self.filters.T + 1e-10)
+        mfcc = log_mel @ self.dct.T
+        # Cepstral mean normalization removes the microphone's channel colouring
+        return mfcc - mfcc.mean(axis=0)
+
+def _dtw_accumulate(a, b):
+    """Accumulated DTW cost matrix of shape (len(a) + 1, len(b) + 1)"""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        # Diagonal and vertical steps vectorize; the horizontal step is a running scan
+        row = cost[i - 1] + np.minimum(acc[i - 1, :-1], acc[i - 1, 1:])
+        for j in range(1, m + 1):
+            acc[i, j] = min(row[j - 1], cost[i - 1, j - 1] + acc[i, j - 1])
+    return acc
+
+def dtw_distance(a, b):
+    """Length-normalized dynamic time warping distance between two MFCC sequences"""
+    if len(a) == 0 or len(b) == 0:
+        return np.inf
+    acc = _dtw_accumulate(a, b)
+    n, m = acc.shape[0] - 1, acc.shape[1] - 1
+    return acc[n, m] / (n + m)
+
+def dtw_match_end(a, b):
+    """Number of frames of a that best align with all of b when a may run on past it (open-end DTW)"""
+    if len(a) == 0 or len(b) == 0:
+        return len(a)
+    acc = _dtw_accumulate(a, b)
+    m = len(b)
+    ends = np.arange(1, len(a) + 1)
+    return int(ends[np.argmin(acc[1:, m] / (ends + m))])
+
+class AudioRingBuffer:
+    """Fixed-size int16 ring buffer that remembers how many samples it has seen"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._position = 0
+        self.total_written = 0
+        self._lock = threading.Lock()
+
+    def write(self, samples):
+        with self._lock:
+            samples = samples[-self.capacity:]
+            end = self._position + len(samples)
+            if end <= self.capacity:
+                self._buffer[self._position:end] = samples
+            else:
+                split = self.capacity - self._position
+                self._buffer[self._position:] = samples[:split]
+                self._buffer[:end - self.capacity] = samples[split:]
+            self._position = end % self.capacity
+            self.total_written += len(samples)
+
+    def read_last(self, count):
+        """The most recent count samples, oldest first"""
+        with self._lock:
+            count = min(count, self.capacity, self.total_written)
+            start = (self._position - count) % self.capacity
+            if start + count <= self.capacity:
+                return self._buffer[start:start + count].copy()
+            return np.concatenate((self._buffer[start:], self._buffer[:self._position]))
+
+    def read_since(self, sample_index):
+        """Everything written after the given absolute sample index that is still buffered"""
+        return self.read_last(max(0, self.total_written - sample_index))
+
+class WakeWordListener:
+    """Always-on microphone loop that fires a callback when the wake word is heard.
+
+    Audio is captured into a ring buffer by the stream callback. A detector
+    thread wakes every hop, skips quiet windows with a cheap energy gate and
+    only then compares MFCCs of the latest window against the enrolled
+    templates with DTW. Audio from where the wake word ends inside the matched
+    window onwards is handed to the callback as pre-roll, so a command spoken
+    straight after the wake word keeps its first syllables.
+    """
+
+    def __init__(self):
+        self.SAMPLE_RATE = int(os.getenv('SAMPLE_RATE', 16000))
+        self.TEMPLATES_DIR = os.getenv('WAKE_WORD_TEMPLATES_DIR', 'wake_word')
+        self.THRESHOLD = float(os.getenv('WAKE_WORD_THRESHOLD', 3.0))
+        self.ENERGY_GATE = float(os.getenv('WAKE_WORD_ENERGY_GATE', 400))
+        self.HOP = int(os.getenv('WAKE_WORD_HOP_MS', 200)) / 1000
+        self.PREROLL = float(os.getenv('WAKE_WORD_PREROLL', 2.0))
+        self.BLOCK_MS = 100
+
+        self.mfcc = MFCCExtractor(self.SAMPLE_RATE)
+        self.templates = self._load_templates()
+        self.window_samples = int(self._longest_template_seconds() * 1.2 * self.SAMPLE_RATE)
+        self.ring = AudioRingBuffer(self.window_samples + int(self.PREROLL * self.SAMPLE_RATE))
+
+        self.on_wake = None
+        self._stream = None
+        self._paused = threading.Event()
+        self._stop_event = threading.Event()
+        self._audio_ready = threading.Event()
+        self._detector_thread = None
+        # Detection only looks at windows made entirely of audio written after this sample
+        self._fresh_from = 0
+
+    def _load_templates(self):
+        templates = []
+        for path in sorted(glob.glob(os.path.join(self.TEMPLATES_DIR, "*.npy"))):
+            try:
+                templates.append(np.load(path))
+            except Exception as e:
+                print(f"Error loading wake word template {path}: {str(e)}")
+        return templates
+
+    def _longest_template_seconds(self):
+        if not self.templates:
+            return 1.5
+        hop_seconds = self.mfcc.hop_length / self.SAMPLE_RATE
+        return max(len(template) for template in self.templates) * hop_seconds
+
+    def start(self, on_wake):
+        """Open the microphone and start listening; on_wake(preroll) runs on the detector thread"""
+        if not self.templates:
+            print(f"No wake word templates in '{self.TEMPLATES_DIR}'. "
+                  "Record some with: python -m services.wake_word enroll")
+            return False
+
+        self.on_wake = on_wake
+        self._stop_event.clear()
+        self._stream = sd.InputStream(
+            samplerate=self.SAMPLE_RATE,
+            channels=1,
+            dtype=np.int16,
+            blocksize=int(self.SAMPLE_RATE * self.BLOCK_MS / 1000),
+            callback=self._audio_callback
+        )
+        self._stream.start()
+        self._detector_thread = threading.Thread(target=self._detect_loop, daemon=True)
+        self._detector_thread.start()
+        print(f"Wake word listener started with {len(self.templates)} template(s)")
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        self._audio_ready.set()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    @property
+    def active(self):
+        return self._stream is not None
+
+    def pause(self):
+        """Release the microphone while a command is being recorded"""
+        if self._stream is not None and not self._paused.is_set():
+            self._paused.set()
+            self._stream.stop()
+
+    def resume(self):
+        if self._stream is not None and self._paused.is_set():
+            # The buffered window still holds the last wake word; wait for a full window of new audio
+            self._fresh_from = self.ring.total_written
+            self._paused.clear()
+            self._stream.start()
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        if status:
+            print(f"Wake word input status: {status}")
+        self.ring.write(indata[:, 0])
+        self._audio_ready.set()
+
+    def _detect_loop(self):
+        last_checked = 0
+        hop_samples = int(self.HOP * self.SAMPLE_RATE)
+        while not self._stop_event.is_set():
+            # Block until the callback delivers audio, so a paused stream costs nothing
+            self._audio_ready.wait()
+            self._audio_ready.clear()
+            if self._stop_event.is_set() or self._paused.is_set():
+                continue
+
+            window_end = self.ring.total_written
+            if window_end - last_checked < hop_samples or window_end - self._fresh_from < self.window_samples:
+                continue
+            last_checked = window_end
+
+            window = self.ring.read_last(self.window_samples)
+            if np.sqrt(np.mean(window.astype(np.float32) ** 2)) < self.ENERGY_GATE:
+                continue
+
+            features = self.mfcc(window)
+            distance, template = min(
+                ((dtw_distance(features, template), index) for index, template in enumerate(self.templates)),
+                key=lambda match: match[0]
+            )
+            if distance < self.THRESHOLD:
+                print(f"Wake word detected (distance {distance:.2f})")
+                self.pause()
+                # Keep everything after the wake word's end, including the tail of the matched window
+                word_frames = dtw_match_end(features, self.templates[template])
+                word_end = window_end - len(window) + min(len(window), (word_frames - 1) * self.mfcc.hop_length + self.mfcc.frame_length)
+                preroll = self.ring.read_since(word_end)
+                if self.on_wake:
+                    self.on_wake(preroll)
+
+    def enroll(self, audio):
+        """Save an int16 recording of the wake word as a new template"""
+        features = self.mfcc(audio)
+        if len(features) == 0:
+            raise ValueError("Recording is too short to use as a wake word template")
+        os.makedirs(self.TEMPLATES_DIR, exist_ok=True)
+        path = os.path.join(self.TEMPLATES_DIR, f"template_{len(self.templates) + 1}.npy")
+        np.save(path, features)
+        self.templates.append(features)
+        self.window_samples = int(self._longest_template_seconds() * 1.2 * self.SAMPLE_RATE)
+        return path
+
+# Create a singleton instance
+wake_word_listener = WakeWordListener()
+
+if __name__ == "__main__":
+    # Usage: python -m services.wake_word enroll [count]
+    if len(sys.argv) < 2 or sys.argv[1] != "enroll":
+        print("Usage: python -m services.wake_word enroll [count]")
+        sys.exit(1)
+
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    duration = 1.5
+    for i in range(count):
+        input(f"[{i + 1}/{count}] Press Enter, then say the wake word...")
+        recording = sd.rec(
+            int(duration * wake_word_listener.SAMPLE_RATE),
+            samplerate=wake_word_listener.SAMPLE_RATE,
+            channels=1,
+            dtype=np.int16
+        )
+        sd.wait()
+        samples = recording[:, 0]
+
+        # Trim the silence around the word so templates only hold speech
+        frame = int(0.02 * wake_word_listener.SAMPLE_RATE)
+        loud = [
+            start for start in range(0, len(samples) - frame, frame)
+            if np.sqrt(np.mean(samples[start:start + frame].astype(np.float32) ** 2)) >= wake_word_listener.ENERGY_GATE
+        ]
+        if not loud:
+            print("Didn't hear anything, try again a little louder.")
+            continue
+        print(f"Saved {wake_word_listener.enroll(samples[loud[0]:loud[-1] + frame])}")
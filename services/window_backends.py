@@ -0,0 +1,290 @@
+import os
+import re
+import sys
+import time
+import shutil
+import threading
+import subprocess
+from dotenv import load_dotenv
+from services.command_engine import check_cancelled
+
+# Load environment variables
+load_dotenv()
+
+def wait_for(condition, deadline, initial=0.05, max_interval=0.25):
+    """Poll condition() until it is truthy or deadline seconds have passed.
+
+    The interval starts at `initial` and doubles up to `max_interval`, so a
+    window that is ready at once costs one check while a slow app launch
+    isn't polled hundreds of times. Returns the last value of condition();
+    raises JobCancelled if the running command is cancelled meanwhile.
+    """
+    end = time.monotonic() + deadline
+    interval = initial
+    while True:
+        check_cancelled()
+        try:
+            result = condition()
+        except Exception as e:
+            print(f"Error checking window state: {str(e)}")
+            result = None
+        if result:
+            return result
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return result
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+# X11 window classes that aren't just the app name respelled
+WINDOW_CLASS_ALIASES = {
+    "Visual Studio Code": ("code",),
+    "zoom.us": ("zoom",),
+    "Microsoft Teams": ("teams", "teams-for-linux"),
+    "Terminal": ("gnome-terminal-server", "gnome-terminal", "konsole", "xfce4-terminal")
+}
+
+def _key(name):
+    return re.sub(r"[^a-z0-9]", "", (name or "").lower())
+
+def app_matches(app_name, *window_names):
+    """True if a window class/owner name is app_name respelled ("Google Chrome" ~ "google-chrome").
+
+    Whole names are compared, so "Code" doesn't match "Xcode" and "Notes"
+    doesn't match "Sticky Notes".
+    """
+    app = _key(app_name)
+    if not app:
+        return False
+    aliases = {_key(alias) for alias in WINDOW_CLASS_ALIASES.get(app_name, ())}
+    return any(_key(name) in aliases | {app} for name in window_names if name)
+
+class WindowManager:
+    """Base class for querying which apps have windows and which one is focused.
+
+    Backends only observe; launching and keystrokes stay in ComputerControl.
+    """
+
+    name = None
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def active_window(self):
+        """(app or window class, title) of the focused window, or (None, None)"""
+        raise NotImplementedError
+
+    def is_running(self, app_name):
+        """True if app_name has at least one window"""
+        raise NotImplementedError
+
+    def is_focused(self, app_name):
+        return app_matches(app_name, self.active_window()[0])
+
+    def is_ready(self, app_name):
+        """The app has a window and it has keyboard focus"""
+        return self.is_focused(app_name) and self.is_running(app_name)
+
+    def launched(self, app_name):
+        """Told when ComputerControl starts app_name; real window managers see it themselves"""
+
+class MacWindowManager(WindowManager):
+    """macOS via osascript and System Events (window titles need Accessibility access)"""
+
+    name = "macos"
+
+    FRONT_WINDOW_SCRIPT = """
+tell application "System Events"
+    set frontApp to first application process whose frontmost is true
+    set appName to name of frontApp
+    try
+        set windowName to name of front window of frontApp
+    on error
+        set windowName to ""
+    end try
+end tell
+return appName & linefeed & windowName
+"""
+
+    @classmethod
+    def available(cls):
+        return sys.platform == "darwin" and shutil.which("osascript") is not None
+
+    @staticmethod
+    def _osascript(script):
+        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True, timeout=2)
+        return result.stdout.strip("\n")
+
+    def active_window(self):
+        app, _, title = self._osascript(self.FRONT_WINDOW_SCRIPT).partition("\n")
+        return (app or None, title or None)
+
+    def is_running(self, app_name):
+        escaped = app_name.replace('"', '\\"')
+        return self._osascript(f'application "{escaped}" is running') == "true"
+
+    def is_ready(self, app_name):
+        # A frontmost process is always running, so one osascript call is enough
+        return self.is_focused(app_name)
+
+class XlibWindowManager(WindowManager):
+    """X11 via python-xlib and the EWMH properties every modern window manager sets"""
+
+    name = "xlib"
+
+    def __init__(self):
+        from Xlib import display, X
+        self._any_type = X.AnyPropertyType
+        self.display = display.Display()
+        self.root = self.display.screen().root
+        self._atoms = {
+            name: self.display.intern_atom(name)
+            for name in ("_NET_ACTIVE_WINDOW", "_NET_CLIENT_LIST", "_NET_WM_NAME", "UTF8_STRING")
+        }
+        # An Xlib Display isn't safe to share between threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def available(cls):
+        if not os.getenv('DISPLAY'):
+            return False
+        try:
+            import Xlib.display  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _describe(self, window_id):
+        window = self.display.create_resource_object("window", window_id)
+        wm_class = window.get_wm_class() or ()
+        title = window.get_full_property(self._atoms["_NET_WM_NAME"], self._atoms["UTF8_STRING"])
+        title = title.value.decode("utf-8", "replace") if title else window.get_wm_name()
+        return wm_class, title
+
+    def active_window(self):
+        with self._lock:
+            active = self.root.get_full_property(self._atoms["_NET_ACTIVE_WINDOW"], self._any_type)
+            if not active or not active.value[0]:
+                return (None, None)
+            wm_class, title = self._describe(active.value[0])
+            return (wm_class[-1] if wm_class else None, title)
+
+    def is_focused(self, app_name):
+        with self._lock:
+            active = self.root.get_full_property(self._atoms["_NET_ACTIVE_WINDOW"], self._any_type)
+            if not active or not active.value[0]:
+                return False
+            wm_class, _ = self._describe(active.value[0])
+            return app_matches(app_name, *wm_class)
+
+    def is_running(self, app_name):
+        with self._lock:
+            clients = self.root.get_full_property(self._atoms["_NET_CLIENT_LIST"], self._any_type)
+            for window_id in clients.value if clients else ():
+                wm_class, _ = self._describe(window_id)
+                if app_matches(app_name, *wm_class):
+                    return True
+            return False
+
+class WmctrlWindowManager(WindowManager):
+    """X11 via the wmctrl and xprop command-line tools, for when python-xlib isn't installed"""
+
+    name = "wmctrl"
+
+    @classmethod
+    def available(cls):
+        return bool(os.getenv('DISPLAY')) and shutil.which("wmctrl") is not None and shutil.which("xprop") is not None
+
+    @staticmethod
+    def _windows():
+        """{window id: (class, title)} from `wmctrl -lx`"""
+        output = subprocess.run(["wmctrl", "-lx"], capture_output=True, text=True, timeout=2).stdout
+        windows = {}
+        for line in output.splitlines():
+            # id, desktop, instance.class, host, title
+            fields = line.split(None, 4)
+            if len(fields) >= 3:
+                windows[int(fields[0], 16)] = (fields[2], fields[4] if len(fields) == 5 else "")
+        return windows
+
+    @staticmethod
+    def _active_id():
+        output = subprocess.run(["xprop", "-root", "_NET_ACTIVE_WINDOW"], capture_output=True, text=True, timeout=2).stdout
+        match = re.search(r"window id # (0x[0-9a-f]+)", output, re.IGNORECASE)
+        return int(match.group(1), 16) if match else None
+
+    def active_window(self):
+        return self._windows().get(self._active_id(), (None, None))
+
+    def is_running(self, app_name):
+        return any(app_matches(app_name, *wm_class.split(".")) for wm_class, _ in self._windows().values())
+
+    def is_focused(self, app_name):
+        wm_class, _ = self.active_window()
+        return wm_class is not None and app_matches(app_name, *wm_class.split("."))
+
+class MockWindowManager(WindowManager):
+    """Scripted window manager for tests: launched apps get a focused window after a delay"""
+
+    name = "mock"
+
+    def __init__(self, launch_delay=None):
+        self.launch_delay = float(os.getenv('MOCK_WINDOW_LAUNCH_DELAY', 0.5)) if launch_delay is None else launch_delay
+        self.windows = {}  # app name -> (ready at, title)
+        self.focused = None
+        self._lock = threading.Lock()
+
+    def launched(self, app_name):
+        self.open_window(app_name, delay=self.launch_delay)
+
+    def open_window(self, app_name, delay=0.0, title=None, focus=True):
+        """Give app_name a window `delay` seconds from now, focused unless focus=False"""
+        with self._lock:
+            self.windows[app_name] = (time.monotonic() + delay, title or app_name)
+            if focus:
+                self.focused = app_name
+
+    def set_title(self, app_name, title):
+        with self._lock:
+            ready_at, _ = self.windows[app_name]
+            self.windows[app_name] = (ready_at, title)
+
+    def _ready(self, app_name):
+        return app_name in self.windows and time.monotonic() >= self.windows[app_name][0]
+
+    def active_window(self):
+        with self._lock:
+            if self.focused is None or not self._ready(self.focused):
+                return (None, None)
+            return (self.focused, self.windows[self.focused][1])
+
+    def is_running(self, app_name):
+        with self._lock:
+            return any(app_matches(app_name, name) and self._ready(name) for name in self.windows)
+
+WINDOW_MANAGERS = {
+    manager.name: manager
+    for manager in (MacWindowManager, XlibWindowManager, WmctrlWindowManager, MockWindowManager)
+}
+
+def create_window_manager(name=None):
+    """The backend selected by WINDOW_MANAGER, or the first available one for 'auto'"""
+    name = (name or os.getenv('WINDOW_MANAGER', 'auto')).lower()
+    if name == 'none':
+        return None
+    if name == 'auto':
+        # The mock is never picked automatically
+        for manager in (MacWindowManager, XlibWindowManager, WmctrlWindowManager):
+            if manager.available():
+                try:
+                    return manager()
+                except Exception as e:
+                    print(f"Error starting {manager.name} window manager backend: {str(e)}")
+        return None
+    if name not in WINDOW_MANAGERS:
+        raise ValueError(f"Unknown WINDOW_MANAGER '{name}', expected auto, none or one of: {', '.join(WINDOW_MANAGERS)}")
+    if not WINDOW_MANAGERS[name].available():
+        print(f"Window manager backend '{name}' is not available")
+        return None
+    return WINDOW_MANAGERS[name]()
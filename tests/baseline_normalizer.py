@@ -0,0 +1,82 @@
+"""Frozen copy of the original TextToSpeech._make_conversational.
+
+The precompiled ConversationalNormalizer must reproduce it exactly,
+random draws included. Don't edit this file: it is the reference that
+tests/data/text_normalizer_golden.json was generated from.
+"""
+import re
+import random
+
+STATUS_PHRASES = ["Processing...", "Listening...", "Responding..."]
+
+CONVERSATION_STARTERS = ["Hmm, ", "Let's see, ", "Okay, ", "Alright, ", "Sure, ", "Got it, "]
+
+RESPONSE_VARIATIONS = {
+    "opening": ["Opening", "Launching", "Starting", "Getting"],
+    "searching": ["Looking up", "Searching for", "Finding info about", "Checking"],
+    "typing": ["Typing", "Entering", "Putting in"],
+    "volume": ["Adjusting volume", "Changing the volume", "Setting volume"],
+    "screenshot": ["Taking a screenshot", "Capturing the screen", "Grabbing a snapshot"]
+}
+
+CONTRACTIONS = {
+    "I am": "I'm",
+    "I have": "I've",
+    "I will": "I'll",
+    "cannot": "can't",
+    "could not": "couldn't",
+    "did not": "didn't",
+    "does not": "doesn't",
+    "do not": "don't",
+    "had not": "hadn't",
+    "has not": "hasn't",
+    "have not": "haven't",
+    "is not": "isn't",
+    "it is": "it's",
+    "should not": "shouldn't",
+    "that is": "that's",
+    "they are": "they're",
+    "was not": "wasn't",
+    "were not": "weren't",
+    "what is": "what's",
+    "will not": "won't",
+    "would not": "wouldn't",
+    "you are": "you're",
+    "you have": "you've",
+    "you will": "you'll"
+}
+
+def make_conversational(text):
+    # Skip preprocessing for system messages like "Processing..." or "Listening..."
+    if text in STATUS_PHRASES:
+        return text
+
+    # Don't add conversation starters to error messages
+    if text.startswith("Error:") or text.startswith("Sorry, I encountered an error"):
+        return text
+
+    # Add random conversation starter (30% of the time when appropriate)
+    if random.random() < 0.3 and not any(text.startswith(starter) for starter in CONVERSATION_STARTERS):
+        text = random.choice(CONVERSATION_STARTERS) + text
+
+    # Replace formal phrases with contractions
+    for formal, contraction in CONTRACTIONS.items():
+        # Use word boundaries to avoid partial word matches
+        text = re.sub(r'\b' + formal + r'\b', contraction, text, flags=re.IGNORECASE)
+
+    # Add SSML pauses for more natural speech rhythm
+    text = text.replace(". ", ". <break time='300ms'/> ")
+    text = text.replace("! ", "! <break time='300ms'/> ")
+    text = text.replace("? ", "? <break time='300ms'/> ")
+    text = text.replace(", ", ", <break time='150ms'/> ")
+
+    # Vary common action phrases
+    for action_type, variations in RESPONSE_VARIATIONS.items():
+        if action_type in text.lower():
+            for phrase in variations:
+                if phrase.lower() in text.lower():
+                    replacement = random.choice(variations)
+                    text = re.sub(r'\b' + phrase + r'\b', replacement, text, flags=re.IGNORECASE)
+                    break
+
+    return text
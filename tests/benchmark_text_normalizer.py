@@ -0,0 +1,34 @@
+"""Microbenchmark: precompiled ConversationalNormalizer against the original implementation.
+
+Usage: python -m tests.benchmark_text_normalizer [iterations]
+"""
+import sys
+import time
+import random
+from services.text_normalizer import ConversationalNormalizer, CONVERSATION_STARTERS, RESPONSE_VARIATIONS
+from tests import baseline_normalizer
+from tests.sample_responses import SAMPLE_RESPONSES
+
+def run(function, iterations):
+    random.seed(0)
+    start = time.perf_counter()
+    for i in range(iterations):
+        function(SAMPLE_RESPONSES[i % len(SAMPLE_RESPONSES)])
+    return time.perf_counter() - start
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    normalizer = ConversationalNormalizer(
+        CONVERSATION_STARTERS,
+        RESPONSE_VARIATIONS,
+        skip_phrases=baseline_normalizer.STATUS_PHRASES
+    )
+
+    baseline = run(baseline_normalizer.make_conversational, iterations)
+    compiled = run(normalizer, iterations)
+    print(f"baseline:    {iterations} responses in {baseline:.3f}s ({baseline / iterations * 1e6:.1f} us each)")
+    print(f"precompiled: {iterations} responses in {compiled:.3f}s ({compiled / iterations * 1e6:.1f} us each)")
+    print(f"speedup:     {baseline / compiled:.1f}x")
+
+if __name__ == "__main__":
+    main()
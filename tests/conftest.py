@@ -0,0 +1,134 @@
+import os
+import sys
+import types
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep tests away from real credentials, caches and desktop backends
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["WINDOW_MANAGER"] = "none"
+os.environ["TTS_ENABLED"] = "false"
+os.environ["TTS_LOCAL_ENGINE"] = "none"
+os.environ["TTS_CACHE_ENABLED"] = "false"
+os.environ["SPECULATIVE_PARSE"] = "false"
+os.environ["INTENT_CACHE_ENABLED"] = "false"
+
+def _fake_module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+def _install_if_missing(name, factory):
+    """Hardware libraries need a display or sound card; fake them where they can't load"""
+    try:
+        __import__(name)
+    except Exception:
+        sys.modules[name] = factory()
+
+class _FakeSound:
+    def __init__(self, file=None, buffer=None):
+        pass
+
+    def play(self):
+        return types.SimpleNamespace(stop=lambda: None, get_busy=lambda: False)
+
+    def get_length(self):
+        return 0.0
+
+class _FakeOutputStream:
+    def __init__(self, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def write(self, data):
+        pass
+
+    def abort(self):
+        pass
+
+_install_if_missing("pygame", lambda: _fake_module(
+    "pygame",
+    mixer=types.SimpleNamespace(init=lambda *a, **k: None, Sound=_FakeSound, get_busy=lambda: False)
+))
+_install_if_missing("sounddevice", lambda: _fake_module(
+    "sounddevice",
+    RawOutputStream=_FakeOutputStream,
+    InputStream=_FakeOutputStream
+))
+_install_if_missing("pyautogui", lambda: _fake_module(
+    "pyautogui",
+    hotkey=lambda *keys: None,
+    write=lambda text, interval=0: None,
+    press=lambda key: None
+))
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Local stand-in for the OpenAI API that streams canned bodies chunk by chunk.
+
+    routes maps a path such as "/v1/audio/speech" to (content type, body),
+    where body is a callable returning an iterable of bytes; each item is
+    sent as its own HTTP chunk so clients see it as it is written.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeOpenAIHandler)
+        self.routes = {}
+        self.requests = []
+        self.finished = threading.Event()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append((self.path, body))
+        if self.path not in self.server.routes:
+            self.send_error(404)
+            return
+        content_type, chunks = self.server.routes[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks():
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.finished.set()
+
+@pytest.fixture
+def openai_server():
+    server = FakeOpenAIServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def openai_test_client(openai_server):
+    """An OpenAI client pointed at the fake server, without the SDK's own retries"""
+    from openai import OpenAI
+    return OpenAI(api_key="test-key", base_url=openai_server.base_url, max_retries=0, timeout=5)
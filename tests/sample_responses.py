@@ -0,0 +1,12 @@
+"""Representative assistant output for the text normalizer golden tests and benchmark"""
+
+SAMPLE_RESPONSES = [
+    "Got it! Opened Safari Opened Safari",
+    "I am opening Chrome for you. It is not running yet, so this will take a second.",
+    "Searching for what time is it in Ottawa. I have opened a new tab and typed it for you.",
+    "Volume set to 40%. You are all set! Is not that better?",
+    "Taking a screenshot now. That is saved in your screenshots folder, you will find it there.",
+    "Sorry, I encountered an error: could not reach the server.",
+    "I cannot do that yet, but I will learn. They are working on it, and it is coming soon.",
+    "Typing hello world. What is next? You have not told me which app to use."
+]
@@ -0,0 +1,98 @@
+import json
+import time
+import pytest
+from services.process_command import CommandProcessor
+from services.tts import SpeechStream, SpeechHandle, PRIORITY_NORMAL
+
+DELTAS = ["Sure", "! The sky", " looks blue because", " air scatters blue light.", " Sunsets", " are red."]
+
+def sse(deltas, delay=0.0, sent=None):
+    """A chat-completions event stream with one delta per event, appended to sent as written"""
+    def body():
+        for index, delta in enumerate(deltas):
+            if index and delay:
+                time.sleep(delay)
+            if sent is not None:
+                sent.append(delta)
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "gpt-4",
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        # The last event carries only the finish reason
+        done = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-4",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        }
+        yield f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode()
+    return body
+
+class Voice:
+    """Records the sentences a SpeechStream hands to TextToSpeech.say"""
+
+    def __init__(self):
+        self.said = []
+
+    def say(self, text, priority=PRIORITY_NORMAL, add_starter=True, coalesce=True):
+        self.said.append(text)
+        return SpeechHandle(text, priority)
+
+@pytest.fixture
+def processor(openai_test_client):
+    processor = CommandProcessor()
+    processor.client = openai_test_client
+    return processor
+
+def test_deltas_arrive_while_the_answer_is_generated(openai_server, processor):
+    openai_server.routes["/v1/chat/completions"] = ("text/event-stream", sse(DELTAS, delay=0.2))
+    deltas = processor.stream_conversation_response("why is the sky blue")
+
+    assert next(deltas) == "Sure"
+    assert not openai_server.finished.is_set()
+    assert ["Sure"] + list(deltas) == DELTAS
+
+    request = json.loads(openai_server.requests[0][1])
+    assert request["stream"] is True
+    assert request["messages"][-1]["content"] == "why is the sky blue"
+
+def test_each_sentence_is_spoken_once_it_is_complete(openai_server, processor):
+    openai_server.routes["/v1/chat/completions"] = ("text/event-stream", sse(DELTAS))
+    voice = Voice()
+    speech = SpeechStream(voice)
+    spoken_while_streaming = []
+    for delta in processor.stream_conversation_response("why is the sky blue"):
+        speech.feed(delta)
+        spoken_while_streaming.append(len(voice.said))
+    speech.close()
+
+    # "Sure!" is spoken as soon as the next sentence starts, before the answer ends
+    assert spoken_while_streaming[1] == 1
+    assert voice.said == ["Sure!", "The sky looks blue because air scatters blue light.", "Sunsets are red."]
+
+def test_cancelling_drops_the_rest_of_the_answer(openai_server, processor):
+    sent = []
+    openai_server.routes["/v1/chat/completions"] = ("text/event-stream", sse(DELTAS, delay=0.2, sent=sent))
+    voice = Voice()
+    speech = SpeechStream(voice)
+    deltas = processor.stream_conversation_response("why is the sky blue")
+    # The UI's stream thread: a newer command cancels the answer mid-stream
+    for index, delta in enumerate(deltas):
+        if index == 2:
+            speech.cancel()
+            break
+        speech.feed(delta)
+    deltas.close()
+    speech.feed(" More text. And more.")
+    speech.close()
+
+    assert voice.said == ["Sure!"]
+    assert speech.cancelled
+    # The connection is closed rather than left reading the unwanted rest
+    assert openai_server.finished.wait(1)
+    assert len(sent) < len(DELTAS)
@@ -0,0 +1,146 @@
+import time
+import pytest
+import services.computer_control as computer_control
+from services.computer_control import ComputerControl
+from services.command_engine import CommandEngine, CANCELLED
+from services.window_backends import MockWindowManager, app_matches, wait_for
+
+class Keyboard:
+    """Records pyautogui calls instead of pressing keys"""
+
+    def __init__(self):
+        self.calls = []
+        self.on_hotkey = None
+
+    def hotkey(self, *keys):
+        self.calls.append(keys)
+        if self.on_hotkey:
+            self.on_hotkey(keys)
+
+    def write(self, text, interval=0):
+        self.calls.append(("write", text))
+
+    def press(self, key):
+        self.calls.append(("press", key))
+
+@pytest.fixture
+def keyboard(monkeypatch):
+    keyboard = Keyboard()
+    monkeypatch.setattr(computer_control, "pyautogui", keyboard)
+    monkeypatch.setattr(computer_control.subprocess, "Popen", lambda *args, **kwargs: None)
+    return keyboard
+
+@pytest.fixture
+def control(keyboard):
+    control = ComputerControl()
+    control.window_manager = MockWindowManager(launch_delay=0.3)
+    control.launch_timeout = 2
+    return control
+
+def timed(function, *args, **kwargs):
+    start = time.monotonic()
+    result = function(*args, **kwargs)
+    return result, time.monotonic() - start
+
+def test_open_application_returns_once_the_window_is_ready(control):
+    result, elapsed = timed(control.open_application, "Google Chrome")
+    assert result == "Opened Google Chrome"
+    assert control.window_manager.is_ready("Google Chrome")
+    # Ready after 0.3s; backoff adds at most one 0.25s interval, well under the old fixed 3s
+    assert 0.3 <= elapsed < 0.7
+
+def test_open_application_gives_up_at_the_deadline(control):
+    control.window_manager.launch_delay = 10
+    control.launch_timeout = 0.4
+    result, elapsed = timed(control.open_application, "Slack")
+    assert result == "Opened Slack"
+    assert not control.window_manager.is_ready("Slack")
+    assert 0.4 <= elapsed < 0.6
+
+def test_spoken_names_are_launched_and_awaited_by_their_os_name(control, monkeypatch):
+    launched = []
+    monkeypatch.setattr(computer_control.subprocess, "Popen", lambda args: launched.append(args))
+    control.launch_timeout = 10
+    result, elapsed = timed(control.open_application, "chrome")
+    assert result == "Opened Google Chrome"
+    assert launched[-1][-1] == "Google Chrome"
+    assert elapsed < 0.7
+
+def test_a_window_focused_by_the_launch_counts_as_ready(control):
+    # Window classes don't always match the app name ("obsidian" vs "Obsidian Notes")
+    manager = control.window_manager
+    manager.open_window("Finder")
+    manager.launched = lambda app_name: manager.open_window("obsidian", delay=0.3)
+    control.launch_timeout = 10
+    _, elapsed = timed(control.open_application, "Obsidian Notes")
+    assert 0.3 <= elapsed < 0.7
+
+def test_unknown_names_wait_no_longer_than_the_old_fixed_delay(control):
+    manager = control.window_manager
+    manager.open_window("Finder")
+    manager.launched = lambda app_name: None
+    control.launch_timeout = 10
+    _, elapsed = timed(control.open_application, "Some Tool")
+    assert 1 <= elapsed < 1.3
+
+def test_new_tab_waits_for_the_title_to_change(control, keyboard):
+    control.window_manager.open_window("Google Chrome", title="Flights - Google Chrome")
+    keyboard.on_hotkey = lambda keys: control.window_manager.set_title("Google Chrome", "New Tab")
+    _, elapsed = timed(control.open_new_browser_tab)
+    assert elapsed < 0.1
+
+    # No visible change: never slower than the old fixed 0.3s wait
+    keyboard.on_hotkey = None
+    _, elapsed = timed(control.open_new_browser_tab)
+    assert 0.3 <= elapsed < 0.45
+
+def test_browser_search_types_into_the_address_bar(control, keyboard):
+    control.window_manager.open_window("Firefox")
+    _, elapsed = timed(control.type_text, "cheap flights", focus_browser=True)
+    assert keyboard.calls[-2:] == [("write", "cheap flights"), ("press", "return")]
+    # Was 0.5 + 0.5 + 0.3 + 0.2s of fixed sleeps
+    assert elapsed < 0.3
+
+def test_waiting_stops_when_the_command_is_cancelled(control):
+    control.window_manager.launch_delay = 10
+    control.launch_timeout = 10
+    engine = CommandEngine()
+    job = engine.submit("open zoom", control.open_application, "zoom.us")
+    time.sleep(0.2)
+    job.cancel()
+    deadline = time.monotonic() + 1
+    while job.status != CANCELLED and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert job.status == CANCELLED
+
+def test_without_a_window_manager_the_fixed_waits_remain(keyboard, monkeypatch):
+    control = ComputerControl()
+    assert control.window_manager is None
+    sleeps = []
+    monkeypatch.setattr(computer_control.time, "sleep", sleeps.append)
+    control.open_application("Google Chrome")
+    control.open_application("Notes")
+    assert sleeps == [3, 1]
+
+def test_wait_for_backs_off_until_the_deadline():
+    calls = []
+    assert not wait_for(lambda: calls.append(time.monotonic()), deadline=0.5)
+    gaps = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    assert len(calls) < 8
+    # The interval doubles up to the cap; only the last sleep is cut short by the deadline
+    assert gaps[0] < gaps[1] < gaps[2]
+    assert max(gaps) < 0.3
+    assert calls[-1] - calls[0] < 0.55
+
+@pytest.mark.parametrize("app_name, window_name, expected", [
+    ("Google Chrome", "google-chrome", True),
+    ("Google Chrome", "Google-chrome", True),
+    ("Firefox", "firefox", True),
+    ("Visual Studio Code", "Code", True),
+    ("Terminal", "gnome-terminal-server", True),
+    ("Code", "Xcode", False),
+    ("Notes", "Sticky Notes", False),
+    ("Safari", None, False)
+])
+def test_app_matches_whole_names(app_name, window_name, expected):
+    assert app_matches(app_name, window_name) is expected
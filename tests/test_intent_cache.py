@@ -0,0 +1,39 @@
+import pytest
+from services.intent_cache import IntentCache
+from services.nagato_agent import Command, CommandType
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = IntentCache()
+    cache.enabled = True
+    cache.path = str(tmp_path / "intent_cache.json")
+    return cache
+
+def open_app(name):
+    return Command(type=CommandType.OPEN_APP, content={"app_name": name})
+
+def test_template_reuses_known_or_cached_app_names(cache):
+    cache.put("open obsidian", open_app("Obsidian"))
+    assert cache.get("open obsidian").content == {"app_name": "Obsidian"}
+    assert cache.get("open the obsidian").content == {"app_name": "Obsidian"}
+    assert cache.get("open chrome").content == {"app_name": "Google Chrome"}
+    assert cache.get("open Visual Studio Code").content == {"app_name": "Visual Studio Code"}
+
+@pytest.mark.parametrize("utterance", ["open a new tab", "open the door", "open my files", "open the pod bay doors"])
+def test_template_leaves_unknown_words_to_the_model(cache, utterance):
+    cache.put("open obsidian", open_app("Obsidian"))
+    assert cache.get(utterance) is None
+
+def test_rewording_does_not_reuse_words_that_set_parameters(cache):
+    cache.put("hey could you please turn the sound up on this computer", Command(type=CommandType.VOLUME, content={"level": 80}))
+    assert cache.get("hey could you please turn the sound down on this computer") is None
+    assert cache.get("hey could you please turn the sound up on this computer").content == {"level": 80}
+
+def test_rewording_fills_number_slots(cache):
+    cache.put("could you set the volume to 40 please", Command(type=CommandType.VOLUME, content={"level": 40}))
+    assert cache.get("could you please set the volume to 70").content == {"level": 70}
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_rewording_reuses_parameterless_commands(cache):
+    cache.put("could you take a screenshot of my screen please", Command(type=CommandType.SCREENSHOT, content={}))
+    assert cache.get("please could you take a screenshot of my screen").type == CommandType.SCREENSHOT
@@ -0,0 +1,35 @@
+import json
+from types import SimpleNamespace
+import pytest
+from services.nagato_agent import nagato_agent, CommandType
+
+def tool_call(name, arguments):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+@pytest.fixture
+def plan_reply(monkeypatch):
+    """Make the language model answer with the given tool calls"""
+    def reply(*tool_calls):
+        message = SimpleNamespace(tool_calls=list(tool_calls))
+        create = lambda **kwargs: SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(nagato_agent, "client", client)
+    return reply
+
+UTTERANCE = "bring up my editor then write a haiku about the sea"
+
+def test_valid_plan_keeps_every_step(plan_reply):
+    plan_reply(tool_call("open_application", {"app_name": "TextEdit"}), tool_call("type_text", {"text": "waves"}))
+    steps = nagato_agent.parse_plan(UTTERANCE)
+    assert [step.type for step in steps] == [CommandType.OPEN_APP, CommandType.TYPE_TEXT]
+
+@pytest.mark.parametrize("bad_step", [
+    tool_call("open_application", {}),
+    tool_call("open_application", "not json"),
+    tool_call("delete_files", {"path": "/"})
+])
+def test_one_bad_step_rejects_the_whole_plan(plan_reply, bad_step):
+    # Typing would otherwise go into whatever window has focus
+    plan_reply(bad_step, tool_call("type_text", {"text": "waves"}))
+    steps = nagato_agent.parse_plan(UTTERANCE)
+    assert [step.type for step in steps] == [CommandType.CONVERSATION]
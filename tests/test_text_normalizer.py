@@ -0,0 +1,59 @@
+import os
+import json
+import random
+import pytest
+from services.text_normalizer import (
+    ConversationalNormalizer, CONVERSATION_STARTERS, RESPONSE_VARIATIONS, split_sentences
+)
+from tests import baseline_normalizer
+from tests.sample_responses import SAMPLE_RESPONSES
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "text_normalizer_golden.json")
+
+with open(GOLDEN_PATH) as f:
+    GOLDEN = json.load(f)
+
+@pytest.fixture
+def normalizer():
+    # Configured the way TextToSpeech builds it
+    return ConversationalNormalizer(
+        CONVERSATION_STARTERS,
+        RESPONSE_VARIATIONS,
+        skip_phrases=baseline_normalizer.STATUS_PHRASES
+    )
+
+def test_golden_covers_every_sample_response():
+    assert set(SAMPLE_RESPONSES) <= {case["text"] for case in GOLDEN}
+
+@pytest.mark.parametrize("case", GOLDEN, ids=lambda case: f"{case['seed']}:{case['text'][:20]}")
+def test_matches_frozen_baseline_output(normalizer, case):
+    random.seed(case["seed"])
+    assert normalizer(case["text"]) == case["expected"]
+
+def test_matches_baseline_on_generated_input(normalizer):
+    # Sentences mixing overlapping contractions, punctuation and action phrases
+    pieces = [
+        "I am", "it is not", "cannot", "you will", "what is", "that is", "they are", "I have not",
+        "Opening", "Searching for", "Typing", "volume", "screenshot", "Taking a screenshot",
+        "Chrome", "the file", "now", "here", "Okay, ", "Sure, "
+    ]
+    punctuation = ["", ".", "!", "?", ","]
+    generator = random.Random(1234)
+    for seed in range(3000):
+        words = [generator.choice(pieces) + generator.choice(punctuation) for _ in range(generator.randint(1, 8))]
+        text = " ".join(words)
+
+        random.seed(seed)
+        expected = baseline_normalizer.make_conversational(text)
+        random.seed(seed)
+        assert normalizer(text) == expected, text
+
+def test_add_starter_false_never_prepends_a_starter(normalizer):
+    for seed in range(50):
+        random.seed(seed)
+        assert not normalizer("It is done.", add_starter=False).startswith(tuple(CONVERSATION_STARTERS))
+
+def test_split_sentences_keeps_first_sentence_alone():
+    chunks = split_sentences("Sure. I opened Chrome. Then I searched for flights to Ottawa.", max_chars=200)
+    assert chunks[0] == "Sure."
+    assert " ".join(chunks) == "Sure. I opened Chrome. Then I searched for flights to Ottawa."
@@ -0,0 +1,83 @@
+import time
+import threading
+import pytest
+import services.tts as tts
+from services.tts import TextToSpeech, PHRASE_RESPONSE
+from services.tts_backends import OpenAISynthesizer
+
+CHUNK = b"\x01\x00" * 2048  # 4096 bytes, one TTS_STREAM_CHUNK_BYTES read
+
+class Speaker:
+    """Stands in for sounddevice, recording when each block of audio was written"""
+
+    def __init__(self):
+        self.writes = []
+        self.aborted = threading.Event()
+        self.first_write = threading.Event()
+
+    def RawOutputStream(self, **kwargs):
+        speaker = self
+
+        class Stream:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def write(self, data):
+                speaker.writes.append((time.monotonic(), len(data)))
+                speaker.first_write.set()
+
+            def abort(self):
+                speaker.aborted.set()
+
+        return Stream()
+
+@pytest.fixture
+def speaker(monkeypatch):
+    speaker = Speaker()
+    monkeypatch.setattr(tts, "sd", speaker)
+    return speaker
+
+@pytest.fixture
+def service(openai_test_client, speaker):
+    service = TextToSpeech()
+    service.remote = OpenAISynthesizer(openai_test_client, "tts-1", "nova")
+    service.local = None
+    return service
+
+def slow_pcm(chunks, delay):
+    def body():
+        for index in range(chunks):
+            if index:
+                time.sleep(delay)
+            yield CHUNK
+    return body
+
+def test_playback_starts_on_the_first_chunk(openai_server, service, speaker):
+    openai_server.routes["/v1/audio/speech"] = ("application/octet-stream", slow_pcm(3, 0.3))
+    handle = service.say("Here is the weather for today", phrase_class=PHRASE_RESPONSE, add_starter=False)
+    sent_at = time.monotonic()
+
+    assert speaker.first_write.wait(2)
+    # The first block plays while the rest of the response is still 0.6s away
+    assert speaker.writes[0][0] - sent_at < 0.3
+    assert not openai_server.finished.is_set()
+
+    assert handle.wait(3)
+    assert sum(size for _, size in speaker.writes) == 3 * len(CHUNK)
+    path, body = openai_server.requests[0]
+    assert path == "/v1/audio/speech"
+    assert b'"response_format":"pcm"' in body.replace(b" ", b"")
+    assert service.last_time_to_first_audio < 0.3
+
+def test_cancel_stops_a_streaming_clip(openai_server, service, speaker):
+    openai_server.routes["/v1/audio/speech"] = ("application/octet-stream", slow_pcm(20, 0.1))
+    handle = service.say("A long answer that keeps on going", phrase_class=PHRASE_RESPONSE, add_starter=False)
+
+    assert speaker.first_write.wait(2)
+    handle.cancel()
+    assert speaker.aborted.wait(1)
+    assert handle.done() and handle.cancelled
+    assert len(speaker.writes) < 20